@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
-import google.generativeai as genai
 import io
+from functools import partial
 from time import sleep
+from pharmacy_rubric import create_prompt, parse_response, RESULT_COLUMNS
+# pandas و کتابخانه Gemini در ابتدای اسکریپت import نمی‌شوند تا درخواست کلید API بلافاصله نمایش داده شود
+from startup import MODEL_NAME, warm_up, make_model
 
 # --- Page Configuration ---
 # تنظیمات اولیه صفحه شامل عنوان، آیکون و طرح‌بندی
@@ -13,65 +15,19 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- Functions ---
-
-def create_prompt(title, abstract):
-    """
-    این تابع یک دستور (prompt) دقیق برای مدل هوش مصنوعی ایجاد می‌کند.
-    """
-    return f"""
-        شما یک متخصص نخبه در زمینه علوم دارویی، توسعه کسب‌وکار و انتقال فناوری هستید.
-        وظیفه شما تحلیل عنوان و چکیده پایان‌نامه زیر از رشته داروسازی است.
-        آن را بر اساس سه معیار اصلی با دقت ارزیابی کنید:
-        1.  **پتانسیل تجاری‌سازی (Commercialization Potential):** آیا این ایده می‌تواند به یک محصول، سرویس یا پتنت سودآور تبدیل شود؟ بازار هدف آن چیست؟
-        2.  **سطح نوآوری (Innovation Level):** آیا این تحقیق یک رویکرد جدید، روش نوین یا کشف بدیع را ارائه می‌دهد؟ در مقایسه با دانش موجود چقدر نوآورانه است؟
-        3.  **پتانسیل ارزش‌آفرینی (Value Creation Potential):** این تحقیق چه مشکلی را حل می‌کند؟ چه ارزشی برای بیماران، صنعت داروسازی یا جامعه علمی ایجاد می‌کند؟
-
-        برای هر معیار یک امتیاز از ۱ تا ۱۰ بدهید. سپس یک تحلیل کلی و مختصر (حداکثر ۲-۳ جمله) ارائه دهید.
-        خروجی را **دقیقا** با فرمت زیر و فقط به زبان فارسی ارائه دهید:
-
-        نوآوری: [امتیاز]/10
-        تجاری‌سازی: [امتیاز]/10
-        ارزش‌آفرینی: [امتیاز]/10
-        تحلیل کلی: [خلاصه تحلیل شما در اینجا]
-
-        ---
-        **عنوان پایان‌نامه:** {title}
-
-        **چکیده پایان‌نامه:** {abstract}
-        ---
-    """
+# نتایج آخرین تحلیل بین اجراهای مجدد صفحه (مثلاً هنگام جستجو یا تغییر صفحه جدول) حفظ می‌شود
+if 'final_df' not in st.session_state:
+    st.session_state.final_df = None
+if 'file_id' not in st.session_state:
+    st.session_state.file_id = None
 
-def parse_response(text):
-    """
-    این تابع پاسخ ساختاریافته مدل هوش مصنوعی را تجزیه کرده و امتیازها و خلاصه را استخراج می‌کند.
-    """
-    data = {
-        "نوآوری": "N/A",
-        "تجاری‌سازی": "N/A",
-        "ارزش‌آفرینی": "N/A",
-        "تحلیل کلی": "خطا در پردازش پاسخ مدل."
-    }
-    try:
-        lines = text.strip().split('\n')
-        for line in lines:
-            if "نوآوری:" in line:
-                data["نوآوری"] = line.split(':')[1].strip().split('/')[0]
-            elif "تجاری‌سازی:" in line:
-                data["تجاری‌سازی"] = line.split(':')[1].strip().split('/')[0]
-            elif "ارزش‌آفرینی:" in line:
-                data["ارزش‌آفرینی"] = line.split(':')[1].strip().split('/')[0]
-            elif "تحلیل کلی:" in line:
-                data["تحلیل کلی"] = line.split(':', 1)[1].strip()
-    except Exception:
-        # در صورت بروز خطا در تجزیه، از پیام پیش‌فرض استفاده می‌شود.
-        pass
-    return data
+# --- Functions ---
 
 def to_excel(df):
     """
     یک DataFrame را به فایل اکسل در حافظه (in-memory) تبدیل می‌کند.
     """
+    import pandas as pd
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='تحلیل_پایان‌نامه‌ها')
@@ -96,21 +52,26 @@ st.sidebar.header("تنظیمات")
 # نکته: مدل gemini-2.0-flash وجود ندارد. از آخرین مدل flash یعنی gemini-1.5-flash-latest استفاده می‌کنیم.
 api_key = st.sidebar.text_input("🔑 کلید API گوگل Gemini خود را وارد کنید:", type="password", help="کلید API شما محرمانه باقی می‌ماند و فقط برای این جلسه استفاده می‌شود.")
 
+# صفحه تا اینجا نمایش داده شده است؛ import کتابخانه‌های سنگین یک بار در پس‌زمینه شروع می‌شود
+warm_up()
+
 if not api_key:
     st.warning("لطفاً برای شروع تحلیل، کلید API گوگل Gemini خود را در نوار کناری وارد کنید.")
     st.stop()
 
-try:
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash-latest')
-except Exception as e:
-    st.error(f"❌ خطا در تنظیم کلید API: لطفاً از معتبر بودن کلید خود اطمینان حاصل کنید.")
-    st.stop()
-
 # 2. بارگذاری فایل
 uploaded_file = st.file_uploader("📂 فایل اکسل حاوی عناوین و چکیده‌ها را بارگذاری کنید", type=["xlsx"])
 
+# با بارگذاری فایل دیگر (یا حذف فایل) نتایج فایل قبلی دیگر نمایش داده نمی‌شوند
+file_id = uploaded_file.file_id if uploaded_file is not None else None
+if file_id != st.session_state.file_id:
+    st.session_state.final_df = None
+    st.session_state.file_id = file_id
+
 if uploaded_file is not None:
+    import pandas as pd
+    from results_view import show_latest_results, show_results_page
+    from text_normalization import prepare_texts, summary_message, STATUS_EMPTY, TEXT_STATUS_COLUMN
     try:
         df = pd.read_excel(uploaded_file)
         st.success("✅ فایل با موفقیت بارگذاری شد. لطفا ستون‌ها را مشخص کنید.")
@@ -123,20 +84,30 @@ if uploaded_file is not None:
         title_col = st.sidebar.selectbox("ستون حاوی **عنوان** را انتخاب کنید:", columns, index=0)
         abstract_col = st.sidebar.selectbox("ستون حاوی **چکیده** را انتخاب کنید:", columns, index=1 if len(columns) > 1 else 0)
 
+        # انبار نتایج تاریخی
+        save_results = st.sidebar.checkbox("🗄️ ذخیره نتایج در انبار تاریخی", value=True)
+
         if st.button("🚀 شروع تحلیل", type="primary"):
             if title_col == abstract_col:
                 st.error("ستون عنوان و چکیده نمی‌توانند یکسان باشند.")
             else:
+                # مدل فقط هنگام شروع تحلیل ساخته می‌شود
+                try:
+                    model = make_model(api_key)
+                except Exception as e:
+                    st.error(f"❌ خطا در تنظیم کلید API: لطفاً از معتبر بودن کلید خود اطمینان حاصل کنید.")
+                    st.stop()
                 with st.spinner("در حال تحلیل... این فرآیند ممکن است بسته به تعداد ردیف‌ها زمان‌بر باشد."):
                     progress_bar = st.progress(0, text="شروع فرآیند تحلیل...")
                     total_rows = len(df)
                     results = []
+                    latest_results = st.empty()
 
-                    for i, row in df.iterrows():
-                        title = str(row.get(title_col, ''))
-                        abstract = str(row.get(abstract_col, ''))
+                    # نرمال‌سازی برداری کل ستون‌ها؛ ردیف‌های بدون عنوان یا چکیده (خالی، NaN یا «nan») به مدل ارسال نمی‌شوند
+                    texts, text_summary = prepare_texts(df, title_col, abstract_col)
 
-                        if not title or not abstract:
+                    for i, (title, abstract, status) in enumerate(texts.itertuples(index=False)):
+                        if status == STATUS_EMPTY:
                             results.append({
                                 "نوآوری": "N/A", "تجاری‌سازی": "N/A",
                                 "ارزش‌آفرینی": "N/A", "تحلیل کلی": "عنوان یا چکیده موجود نیست."
@@ -153,35 +124,42 @@ if uploaded_file is not None:
                                     "نوآوری": "خطا", "تجاری‌سازی": "خطا",
                                     "ارزش‌آفرینی": "خطا", "تحلیل کلی": str(e)
                                 })
-                        
-                        # یک تأخیر کوتاه برای جلوگیری از رسیدن به محدودیت‌های API
-                        sleep(1) 
+
+                            # یک تأخیر کوتاه برای جلوگیری از رسیدن به محدودیت‌های API
+                            sleep(1)
                         progress_bar.progress((i + 1) / total_rows, text=f"در حال پردازش ردیف {i+1} از {total_rows}")
+                        # فقط چند نتیجه آخر نمایش داده می‌شود تا هزینه هر به‌روزرسانی ثابت بماند
+                        show_latest_results(results, container=latest_results)
                 
                 st.success("🎉 تحلیل با موفقیت انجام شد!")
+                st.info(summary_message(text_summary))
 
                 # ایجاد DataFrame از نتایج و الحاق آن به DataFrame اصلی
                 results_df = pd.DataFrame(results)
                 
                 # تغییر نام ستون‌ها برای وضوح بیشتر
-                results_df.rename(columns={
-                    "نوآوری": "امتیاز نوآوری",
-                    "تجاری‌سازی": "امتیاز تجاری‌سازی",
-                    "ارزش‌آفرینی": "امتیاز ارزش‌آفرینی",
-                    "تحلیل کلی": "خلاصه تحلیل هوش مصنوعی"
-                }, inplace=True)
+                results_df.rename(columns=RESULT_COLUMNS, inplace=True)
+                results_df[TEXT_STATUS_COLUMN] = texts[TEXT_STATUS_COLUMN].to_numpy()
                 
-                final_df = pd.concat([df, results_df], axis=1)
-
-                st.dataframe(final_df)
-
-                # 4. دکمه دانلود
-                excel_data = to_excel(final_df)
-                st.download_button(
-                    label="📥 دانلود فایل اکسل نتایج",
-                    data=excel_data,
-                    file_name="تحلیل_پایان‌نامه‌ها.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                st.session_state.final_df = pd.concat([df, results_df], axis=1)
+                latest_results.empty()
+
+                # ثبت نتایج در انبار ستونی برای گزارش‌های تاریخی (results_warehouse.py)
+                if save_results:
+                    try:
+                        from results_warehouse import append_job
+                        append_job(st.session_state.final_df, ["pharmacy"], MODEL_NAME, title_col=title_col)
+                    except Exception as e:
+                        st.warning(f"ذخیره نتایج در انبار ناموفق بود: {e}")
+
+        # 4. نمایش نتایج و دکمه دانلود
+        if st.session_state.final_df is not None:
+            show_results_page(st.session_state.final_df)
+            st.download_button(
+                label="📥 دانلود فایل اکسل نتایج",
+                data=partial(to_excel, st.session_state.final_df), # فایل فقط هنگام کلیک ساخته می‌شود
+                file_name="تحلیل_پایان‌نامه‌ها.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
     except Exception as e:
         st.error(f"خطا در خواندن فایل اکسل: {e}")
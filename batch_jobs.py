@@ -0,0 +1,378 @@
+"""
+امتیازدهی انبوه آفلاین با سرویس پیش‌بینی دسته‌ای (batch prediction).
+
+به جای نگه داشتن یک جلسه Streamlit با یک فراخوانی در هر ثانیه، همه درخواست‌های create_prompt
+در یک فایل JSONL (یک سطر برای هر پایان‌نامه با کلید row-<شماره>) نوشته و یک‌جا به سرویس
+دسته‌ای ارسال می‌شوند. وضعیت کار در فایل job.json پوشه کار نگهداری می‌شود و پس از اتمام،
+فایل خروجی دریافت و با همان parse_response اپلیکیشن‌ها به ترتیب ورودی ادغام می‌شود.
+
+پشتیبان‌ها:
+    gemini: Batch API جمینای (بسته google-genai، کلید در GOOGLE_API_KEY)
+    local:  جایگزین محلی برای آزمون؛ کارها در یک پوشه صف (spool) قرار می‌گیرند و فرمان
+            local-worker آن‌ها را (با مدل واقعی یا --mock) پردازش کرده و خروجی را با همان
+            قالب Batch API می‌نویسد.
+
+نمونه اجرا:
+    python batch_jobs.py prepare theses.xlsx --job jobs/1403 --title-col عنوان --abstract-col چکیده
+    GOOGLE_API_KEY=... python batch_jobs.py submit --job jobs/1403 --backend gemini
+    python batch_jobs.py status --job jobs/1403 --wait
+    python batch_jobs.py merge --job jobs/1403 --out results.xlsx
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from gemini_client import MODEL_NAME
+from rubrics import RUBRICS, create_prompt, empty_result, get_rubrics, parse_response, result_columns
+from text_normalization import STATUS_EMPTY, TEXT_STATUS_COLUMN, prepare_texts, summary_message
+
+DEFAULT_SPOOL_DIR = "batch_spool"
+
+MANIFEST = "job.json"
+REQUESTS = "requests.jsonl"
+RESULTS = "results.jsonl"
+
+# وضعیت‌های پایانی کار
+FINISHED = {"succeeded", "failed", "cancelled", "expired"}
+
+
+def _row_key(i):
+    return f"row-{i:07d}"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _write_json(path, data):
+    # نوشتن در فایل موقت و جایگزینی اتمیک تا فرمان‌های همزمان status فایل نیمه‌کاره نبینند
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_manifest(job_dir):
+    with open(os.path.join(job_dir, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(job_dir, manifest):
+    manifest["updated_at"] = _now()
+    _write_json(os.path.join(job_dir, MANIFEST), manifest)
+
+
+def response_text(line):
+    """ متن پاسخ مدل از یک سطر خروجی Batch API؛ در صورت خطا None و پیام خطا. """
+    if line.get("error"):
+        return None, str(line["error"].get("message", line["error"]))
+    try:
+        parts = line["response"]["candidates"][0]["content"]["parts"]
+        return "".join(part.get("text", "") for part in parts), None
+    except (KeyError, IndexError, TypeError):
+        return None, "پاسخ خالی یا مسدودشده"
+
+
+# --- پشتیبان‌ها ---
+
+class LocalBatchBackend:
+    """
+    جایگزین محلی سرویس دسته‌ای: submit فایل درخواست‌ها را در پوشه صف کپی می‌کند و process
+    (فرمان local-worker) آن را سطر به سطر با یک مدل generate_content پردازش می‌کند.
+    """
+
+    name = "local"
+
+    def __init__(self, spool_dir=DEFAULT_SPOOL_DIR):
+        self.spool_dir = spool_dir
+
+    def options(self):
+        return {"spool_dir": os.path.abspath(self.spool_dir)}
+
+    def _dir(self, batch_id):
+        return os.path.join(self.spool_dir, batch_id)
+
+    def _set_state(self, batch_id, state, **extra):
+        _write_json(os.path.join(self._dir(batch_id), "state.json"), {"state": state, "updated_at": _now(), **extra})
+
+    def submit(self, requests_path, model_name, display_name=None):
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._dir(batch_id))
+        shutil.copyfile(requests_path, os.path.join(self._dir(batch_id), "input.jsonl"))
+        self._set_state(batch_id, "pending", model=model_name, display_name=display_name)
+        return batch_id
+
+    def status(self, batch_id):
+        with open(os.path.join(self._dir(batch_id), "state.json"), encoding="utf-8") as f:
+            return json.load(f)["state"]
+
+    def download(self, batch_id, destination):
+        shutil.copyfile(os.path.join(self._dir(batch_id), "output.jsonl"), destination)
+
+    def pending(self):
+        if not os.path.isdir(self.spool_dir):
+            return []
+        return sorted(b for b in os.listdir(self.spool_dir)
+                      if os.path.exists(os.path.join(self._dir(b), "state.json")) and self.status(b) == "pending")
+
+    def process(self, batch_id, model, delay=0.0):
+        """ همه درخواست‌های یک کار را پردازش و خروجی را با قالب Batch API می‌نویسد. خروجی: تعداد سطرها. """
+        self._set_state(batch_id, "running")
+        n = 0
+        tmp = os.path.join(self._dir(batch_id), "output.jsonl.tmp")
+        with open(os.path.join(self._dir(batch_id), "input.jsonl"), encoding="utf-8") as src, \
+                open(tmp, "w", encoding="utf-8") as out:
+            for raw in src:
+                line = json.loads(raw)
+                prompt = "".join(part["text"] for part in line["request"]["contents"][0]["parts"])
+                try:
+                    text = model.generate_content(prompt).text
+                    result = {"key": line["key"], "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}}
+                except Exception as e:
+                    result = {"key": line["key"], "error": {"message": str(e)}}
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                n += 1
+                if delay:
+                    time.sleep(delay)
+        os.replace(tmp, os.path.join(self._dir(batch_id), "output.jsonl"))
+        self._set_state(batch_id, "succeeded", rows=n)
+        return n
+
+
+class GeminiBatchBackend:
+    """ Batch API جمینای (قیمت دسته‌ای) از طریق بسته google-genai. """
+
+    name = "gemini"
+
+    # نگاشت وضعیت‌های JobState به وضعیت‌های این ماژول
+    STATES = {
+        "JOB_STATE_QUEUED": "pending", "JOB_STATE_PENDING": "pending", "JOB_STATE_RUNNING": "running",
+        "JOB_STATE_UPDATING": "running", "JOB_STATE_PAUSED": "running", "JOB_STATE_CANCELLING": "running",
+        "JOB_STATE_SUCCEEDED": "succeeded", "JOB_STATE_PARTIALLY_SUCCEEDED": "succeeded",
+        "JOB_STATE_FAILED": "failed", "JOB_STATE_CANCELLED": "cancelled", "JOB_STATE_EXPIRED": "expired",
+    }
+
+    def __init__(self, api_key=None):
+        from google import genai
+        self.client = genai.Client(api_key=api_key or os.environ["GOOGLE_API_KEY"])
+
+    def options(self):
+        return {}
+
+    def submit(self, requests_path, model_name, display_name=None):
+        uploaded = self.client.files.upload(
+            file=requests_path, config={"display_name": display_name or os.path.basename(requests_path),
+                                        "mime_type": "jsonl"})
+        job = self.client.batches.create(model=model_name, src=uploaded.name,
+                                         config={"display_name": display_name or uploaded.name})
+        return job.name
+
+    def status(self, batch_id):
+        return self.STATES.get(self.client.batches.get(name=batch_id).state.name, "pending")
+
+    def download(self, batch_id, destination):
+        job = self.client.batches.get(name=batch_id)
+        content = self.client.files.download(file=job.dest.file_name)
+        with open(destination, "wb") as f:
+            f.write(content)
+
+
+BACKENDS = {"local": LocalBatchBackend, "gemini": GeminiBatchBackend}
+
+
+def make_backend(name, **options):
+    return BACKENDS[name](**options)
+
+
+# --- چرخه عمر کار ---
+
+def prepare_job(job_dir, df, title_col, abstract_col, rubric_keys=("innovation",), source=None, model_name=MODEL_NAME):
+    """
+    درخواست ردیف‌ها را (با متن نرمال‌شده و به ترتیب ورودی) در requests.jsonl می‌نویسد؛ ردیف‌های بدون
+    عنوان یا چکیده ارسال نمی‌شوند و در مانیفست ثبت می‌شوند. خروجی: تعداد درخواست‌های نوشته‌شده.
+    """
+    rubric_keys = [key for key, _ in get_rubrics(list(rubric_keys))]
+    os.makedirs(job_dir, exist_ok=True)
+    if os.path.exists(os.path.join(job_dir, MANIFEST)):
+        raise ValueError("این پوشه کار قبلاً ساخته شده است؛ برای کار جدید یک پوشه جدید انتخاب کنید.")
+
+    texts, summary = prepare_texts(df, title_col, abstract_col)
+    skipped = []
+    with open(os.path.join(job_dir, REQUESTS), "w", encoding="utf-8") as f:
+        for i, (title, abstract, status) in enumerate(texts.itertuples(index=False)):
+            if status == STATUS_EMPTY:
+                skipped.append(i)
+                continue
+            request = {"contents": [{"role": "user", "parts": [{"text": create_prompt(title, abstract, rubric_keys)}]}]}
+            f.write(json.dumps({"key": _row_key(i), "request": request}, ensure_ascii=False) + "\n")
+
+    save_manifest(job_dir, {
+        "state": "prepared", "created_at": _now(), "rubrics": rubric_keys, "model": model_name,
+        "source": source or "", "title_col": str(title_col), "abstract_col": str(abstract_col),
+        "total_rows": len(texts), "backend": None, "backend_options": {}, "batch_id": None,
+        "text_summary": summary, "skipped_rows": skipped,
+    })
+    return len(texts) - len(skipped)
+
+
+def submit_job(job_dir, backend):
+    """ فایل درخواست‌ها را به پشتیبان ارسال و شناسه کار دسته‌ای را ثبت می‌کند. """
+    manifest = load_manifest(job_dir)
+    if manifest["state"] != "prepared":
+        raise ValueError(f"این کار قبلاً ارسال شده است (وضعیت: {manifest['state']}).")
+    manifest["batch_id"] = backend.submit(os.path.join(job_dir, REQUESTS), manifest["model"],
+                                          display_name=os.path.basename(os.path.abspath(job_dir)))
+    manifest.update(state="submitted", submitted_at=_now(), backend=backend.name, backend_options=backend.options())
+    save_manifest(job_dir, manifest)
+    return manifest["batch_id"]
+
+
+def refresh_status(job_dir):
+    """ وضعیت کار را از پشتیبان می‌پرسد و پس از اتمام موفق، فایل خروجی را دریافت می‌کند. """
+    manifest = load_manifest(job_dir)
+    if manifest["state"] in FINISHED or manifest["state"] == "prepared":
+        return manifest
+    backend = make_backend(manifest["backend"], **manifest["backend_options"])
+    state = backend.status(manifest["batch_id"])
+    if state == "succeeded":
+        backend.download(manifest["batch_id"], os.path.join(job_dir, RESULTS))
+        manifest["finished_at"] = _now()
+    if state != manifest["state"]:
+        manifest["state"] = state
+        save_manifest(job_dir, manifest)
+    return manifest
+
+
+def wait(job_dir, poll_interval=60.0, timeout=None):
+    """ تا پایان کار (یا timeout ثانیه) هر poll_interval ثانیه وضعیت را بررسی می‌کند. """
+    start = time.time()
+    while True:
+        manifest = refresh_status(job_dir)
+        if manifest["state"] in FINISHED or (timeout is not None and time.time() - start > timeout):
+            return manifest
+        time.sleep(poll_interval)
+
+
+def collect_results(job_dir):
+    """
+    نتایج parse_response را به ترتیب ردیف‌های ورودی برمی‌گرداند. ردیف‌هایی که پاسخ ندارند یا
+    با خطا برگشته‌اند مانند صف توزیع‌شده با «خطا: ...» در تحلیل کلی علامت‌گذاری می‌شوند.
+    """
+    manifest = load_manifest(job_dir)
+    if manifest["state"] != "succeeded":
+        raise ValueError(f"کار هنوز تمام نشده است (وضعیت: {manifest['state']}).")
+    rubric_keys = manifest["rubrics"]
+    by_key = {}
+    with open(os.path.join(job_dir, RESULTS), encoding="utf-8") as f:
+        for raw in f:
+            if raw.strip():
+                line = json.loads(raw)
+                by_key[line.get("key")] = line
+
+    skipped = set(manifest.get("skipped_rows", []))
+    results = []
+    for i in range(manifest["total_rows"]):
+        line = by_key.get(_row_key(i))
+        if i in skipped:
+            results.append(empty_result(rubric_keys, "عنوان یا چکیده موجود نیست."))
+        elif line is None:
+            results.append(empty_result(rubric_keys, "خطا: پاسخی در خروجی کار دسته‌ای نیست"))
+        else:
+            text, error = response_text(line)
+            results.append(parse_response(text, rubric_keys) if error is None else empty_result(rubric_keys, f"خطا: {error}"))
+    return results
+
+
+def merge(job_dir, df):
+    """ ستون‌های نتایج را به همان ترتیب ورودی کنار df قرار می‌دهد (مشابه final_df در اپلیکیشن‌ها). """
+    manifest = load_manifest(job_dir)
+    if manifest["total_rows"] != len(df):
+        raise ValueError("تعداد ردیف‌های فایل ورودی با کار دسته‌ای همخوانی ندارد.")
+    results_df = pd.DataFrame(collect_results(job_dir))
+    results_df.rename(columns=result_columns(manifest["rubrics"]), inplace=True)
+    results_df[TEXT_STATUS_COLUMN] = prepare_texts(df, manifest["title_col"], manifest["abstract_col"])[0][TEXT_STATUS_COLUMN].to_numpy()
+    return pd.concat([df.reset_index(drop=True), results_df.reset_index(drop=True)], axis=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="امتیازدهی انبوه آفلاین پایان‌نامه‌ها با سرویس دسته‌ای")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("prepare", help="ساخت فایل درخواست‌های JSONL از فایل اکسل")
+    p.add_argument("input")
+    p.add_argument("--job", required=True, help="پوشه کار")
+    p.add_argument("--title-col", required=True)
+    p.add_argument("--abstract-col", required=True)
+    p.add_argument("--rubric", nargs="+", choices=sorted(RUBRICS), default=["innovation"],
+                   help="با انتخاب چند روبریک، هر ردیف با یک درخواست ترکیبی ارزیابی می‌شود")
+    p.add_argument("--model", default=MODEL_NAME)
+
+    p = sub.add_parser("submit", help="ارسال کار به سرویس دسته‌ای")
+    p.add_argument("--job", required=True)
+    p.add_argument("--backend", choices=sorted(BACKENDS), default="gemini")
+    p.add_argument("--spool", default=DEFAULT_SPOOL_DIR, help="پوشه صف پشتیبان محلی")
+
+    p = sub.add_parser("status", help="به‌روزرسانی و نمایش وضعیت کار")
+    p.add_argument("--job", required=True)
+    p.add_argument("--wait", action="store_true", help="منتظر ماندن تا پایان کار")
+    p.add_argument("--poll-interval", type=float, default=60.0)
+
+    p = sub.add_parser("merge", help="ادغام نتایج با فایل ورودی به ترتیب اصلی")
+    p.add_argument("--job", required=True)
+    p.add_argument("--input", help="فایل اکسل ورودی (پیش‌فرض: همان فایل زمان ساخت کار)")
+    p.add_argument("--out", required=True)
+    p.add_argument("--warehouse", help="پوشه انبار نتایج تاریخی (results_warehouse.py) برای ثبت این کار")
+    p.add_argument("--group-col", help="ستون گروه (مثلاً دانشکده) برای گزارش‌های انبار")
+
+    p = sub.add_parser("local-worker", help="پردازش کارهای منتظر پشتیبان محلی")
+    p.add_argument("--spool", default=DEFAULT_SPOOL_DIR)
+    p.add_argument("--mock", action="store_true", help="مدل ساختگی load_test به جای Gemini (بدون API)")
+    p.add_argument("--delay", type=float, default=1.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        df = pd.read_excel(args.input)
+        n = prepare_job(args.job, df, args.title_col, args.abstract_col, args.rubric,
+                        source=os.path.abspath(args.input), model_name=args.model)
+        print(f"{n} درخواست در {os.path.join(args.job, REQUESTS)} نوشته شد.")
+        print(summary_message(load_manifest(args.job)["text_summary"]))
+    elif args.command == "submit":
+        backend = make_backend("local", spool_dir=args.spool) if args.backend == "local" else make_backend(args.backend)
+        print(f"کار با شناسه {submit_job(args.job, backend)} ارسال شد.")
+    elif args.command == "status":
+        manifest = wait(args.job, args.poll_interval) if args.wait else refresh_status(args.job)
+        print(json.dumps({k: manifest.get(k) for k in ("state", "batch_id", "backend", "total_rows",
+                                                         "submitted_at", "finished_at")}, ensure_ascii=False))
+    elif args.command == "merge":
+        manifest = load_manifest(args.job)
+        df = pd.read_excel(args.input or manifest["source"])
+        merged = merge(args.job, df)
+        merged.to_excel(args.out, index=False)
+        print(f"نتایج در {args.out} ذخیره شد.")
+        if args.warehouse:
+            from results_warehouse import append_job
+            n = append_job(merged, manifest["rubrics"], manifest["model"], manifest["title_col"], args.group_col,
+                           args.warehouse)
+            print(f"{n} سطر امتیاز در انبار {args.warehouse} ثبت شد.")
+    elif args.command == "local-worker":
+        backend = LocalBatchBackend(args.spool)
+        if args.mock:
+            from load_test import MockModel
+            model, delay = MockModel(), 0.0
+        else:
+            from gemini_client import make_model
+            model, delay = make_model(), args.delay
+        for batch_id in backend.pending():
+            print(f"{batch_id}: {backend.process(batch_id, model, delay)} درخواست پردازش شد.")
+
+
+if __name__ == "__main__":
+    main()
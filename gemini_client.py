@@ -0,0 +1,17 @@
+"""
+نام مدل و ساخت کلاینت Gemini، مشترک بین اپلیکیشن‌های Streamlit و ابزارهای خط فرمان.
+
+این ماژول Streamlit را import نمی‌کند و کتابخانه google.generativeai نیز فقط هنگام ساخت مدل
+بارگذاری می‌شود، بنابراین import آن در کارگرهای sharded_scoring و batch_jobs ارزان است.
+"""
+
+import os
+
+MODEL_NAME = 'gemini-1.5-flash-latest'
+
+
+def make_model(api_key=None, model_name=MODEL_NAME):
+    """ کلاینت Gemini را می‌سازد؛ بدون api_key کلید از متغیر محیطی GOOGLE_API_KEY خوانده می‌شود. """
+    import google.generativeai as genai
+    genai.configure(api_key=api_key or os.environ["GOOGLE_API_KEY"])
+    return genai.GenerativeModel(model_name)
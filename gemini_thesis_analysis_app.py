@@ -1,9 +1,11 @@
 import streamlit as st
-import pandas as pd
-import google.generativeai as genai
-import google.api_core.exceptions
 import io
+from functools import partial
 from time import sleep
+import innovation_rubric
+from rubrics import RUBRICS, create_prompt, empty_result, parse_response, result_columns, result_key
+# pandas و کتابخانه Gemini در ابتدای اسکریپت import نمی‌شوند تا درخواست کلید API بلافاصله نمایش داده شود
+from startup import MODEL_NAME, warm_up, make_model
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -27,74 +29,52 @@ if 'processed_rows' not in st.session_state:
     st.session_state.processed_rows = 0
 if 'uploader_key' not in st.session_state:
     st.session_state.uploader_key = 0
+if 'local_results' not in st.session_state:
+    st.session_state.local_results = None
+if 'local_confidence' not in st.session_state:
+    st.session_state.local_confidence = None
+if 'local_rows' not in st.session_state:
+    st.session_state.local_rows = 0
+if 'prior_art' not in st.session_state:
+    st.session_state.prior_art = None
+if 'prior_art_context' not in st.session_state:
+    st.session_state.prior_art_context = None
+if 'order' not in st.session_state:
+    st.session_state.order = None
+if 'sample_size' not in st.session_state:
+    st.session_state.sample_size = 0
+if 'extra_calls' not in st.session_state:
+    st.session_state.extra_calls = 0
+if 'resampled_rows' not in st.session_state:
+    st.session_state.resampled_rows = 0
+if 'model' not in st.session_state:
+    st.session_state.model = None
+if 'stratum_col' not in st.session_state:
+    st.session_state.stratum_col = None
+if 'warehouse_saved' not in st.session_state:
+    st.session_state.warehouse_saved = False
+if 'texts' not in st.session_state:
+    st.session_state.texts = None
+if 'text_summary' not in st.session_state:
+    st.session_state.text_summary = None
 
-# --- Functions ---
+# حالت‌های امتیازدهی: فقط Gemini، فقط مدل محلی، یا ارسال ردیف‌های نامطمئن مدل محلی به Gemini
+SCORING_MODES = {
+    "gemini": "فقط Gemini",
+    "fast": "⚡ سریع (مدل محلی، بدون API)",
+    "hybrid": "ترکیبی (فقط ردیف‌های نامطمئن به Gemini)",
+}
 
-def create_prompt(title, abstract):
-    # این تابع بدون تغییر باقی می‌ماند
-    return f"""
-        شما یک متخصص ارزیابی نوآوری و انتقال فناوری هستید.
-        وظیفه شما تحلیل عنوان و چکیده پایان‌نامه زیر بر اساس **"جدول ارزیابی اثبات مفهوم برای رتبه‌بندی نوآوری"** است.
-        برای هر یک از ۵ شاخص زیر، یک امتیاز بر اساس توضیحات داده شده اختصاص دهید و در نهایت نمره کل و پتانسیل نوآوری را مشخص کنید.
-
-        **شاخص‌ها و نحوه امتیازدهی:**
-
-        1.  **حوزه علمی پایان‌نامه (امتیاز ۰ تا ۳):** آیا در حوزه‌هایی است که بیشترین ارجحیت را دارند؟ (مانند: داروسازی، مهندسی علوم زیستی، مواد، پزشکی و...). اگر در حوزه‌های با اولویت بالا بود امتیاز ۳، متوسط ۲، کم ۱ و نامرتبط ۰ بدهید.
-        2.  **استفاده از فناوری با نوآوری خاص (امتیاز ۰ تا ۳):** آیا چکیده به تکنولوژی نو، مدل فنی، محصول، الگوریتم، فرآیند، یا متدولوژی جدید اشاره دارد؟ اگر اشاره واضحی داشت امتیاز ۳، اشاره ضمنی ۱، و در غیر این صورت ۰ بدهید.
-        3.  **حل مسئله صنعتی/اجتماعی مشخص (امتیاز ۰ تا ۳):** آیا در چکیده به یک نیاز یا مسئله کاربردی خاص اشاره شده است؟ اگر مسئله کاملاً مشخص و کاربردی است امتیاز ۳، اگر کلی است ۱ و در غیر این صورت ۰ بدهید.
-        4.  **قابلیت تجاری‌سازی (امتیاز ۰ تا ۳):** آیا پایان‌نامه به نتایج ملموسی که قابل توسعه به محصول، نرم‌افزار، یا دستگاه باشد، اشاره می‌کند؟ اگر پتانسیل مستقیم دارد امتیاز ۳، پتانسیل غیرمستقیم ۱ و در غیر این صورت ۰ بدهید.
-        5.  **همکاری با صنعت/نهاد غیردانشگاهی (امتیاز ۰ یا ۱):** آیا چکیده نشان می‌دهد با یک نهاد صنعتی یا سازمانی همکاری شده است؟ اگر بله ۱، اگر نه ۰.
-
-        **تحلیل و خروجی:**
-        پس از امتیازدهی به هر شاخص، نمره نهایی را از جمع امتیازات محاسبه کنید.
-        سپس بر اساس نمره نهایی، "پتانسیل نوآوری" را طبقه‌بندی کنید:
-        - **پتانسیل بالا:** نمره ۸ تا ۱۰ (و بالاتر)
-        - **پتانسیل متوسط:** نمره ۵ تا ۷
-        - **پتانسیل ضعیف:** نمره کمتر از ۵
-
-        در انتها یک تحلیل کلی مختصر (حداکثر ۲ جمله) برای توجیه امتیازات ارائه دهید.
-
-        خروجی را **دقیقا** با فرمت زیر و فقط به زبان فارسی ارائه دهید:
-
-        حوزه علمی: [امتیاز]/3
-        فناوری خاص: [امتیاز]/3
-        حل مسئله: [امتیاز]/3
-        تجاری‌سازی: [امتیاز]/3
-        همکاری: [امتیاز]/1
-        نمره نهایی: [جمع امتیازات]
-        پتانسیل نوآوری: [ضعیف/متوسط/بالا]
-        تحلیل کلی: [خلاصه تحلیل شما در اینجا]
-
-        ---
-        **عنوان پایان‌نامه:** {title}
-
-        **چکیده پایان‌نامه:** {abstract}
-        ---
-    """
-
-def parse_response(text):
-    # این تابع بدون تغییر باقی می‌ماند
-    data = {
-        "حوزه علمی": "N/A", "فناوری خاص": "N/A", "حل مسئله": "N/A",
-        "تجاری‌سازی": "N/A", "همکاری": "N/A", "نمره نهایی": "N/A",
-        "پتانسیل نوآوری": "N/A", "تحلیل کلی": "خطا در پردازش پاسخ مدل."
-    }
-    try:
-        lines = text.strip().split('\n')
-        for line in lines:
-            if "حوزه علمی:" in line: data["حوزه علمی"] = line.split(':')[1].strip().split('/')[0]
-            elif "فناوری خاص:" in line: data["فناوری خاص"] = line.split(':')[1].strip().split('/')[0]
-            elif "حل مسئله:" in line: data["حل مسئله"] = line.split(':')[1].strip().split('/')[0]
-            elif "تجاری‌سازی:" in line: data["تجاری‌سازی"] = line.split(':')[1].strip().split('/')[0]
-            elif "همکاری:" in line: data["همکاری"] = line.split(':')[1].strip().split('/')[0]
-            elif "نمره نهایی:" in line: data["نمره نهایی"] = line.split(':')[1].strip()
-            elif "پتانسیل نوآوری:" in line: data["پتانسیل نوآوری"] = line.split(':')[1].strip()
-            elif "تحلیل کلی:" in line: data["تحلیل کلی"] = line.split(':', 1)[1].strip()
-    except Exception: pass
-    return data
+# ترتیب پردازش: ترتیب فایل، یا ابتدا یک نمونه تصادفی طبقه‌بندی‌شده برای برآورد زودهنگام سبد
+SCHEDULES = {
+    "file": "ترتیب فایل",
+    "sample": "ابتدا نمونه طبقه‌بندی‌شده (پیش‌نمایش سبد)",
+}
+
+# --- Functions ---
 
 def to_excel(df):
-    # این تابع بدون تغییر باقی می‌ماند
+    import pandas as pd
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='تحلیل_نوآوری')
@@ -104,6 +84,55 @@ def to_excel(df):
             writer.sheets['تحلیل_نوآوری'].set_column(col_idx, col_idx, column_length)
     return output.getvalue()
 
+@st.cache_resource
+def load_distilled_scorer(path):
+    """ مدل محلی آموزش‌دیده با distilled_scorer.py را یک بار بارگذاری می‌کند """
+    from distilled_scorer import DistilledScorer
+    return DistilledScorer.load(path)
+
+@st.cache_resource
+def load_prior_art_index(path):
+    """ نمایه شباهت پایان‌نامه‌های پیشین (ساخته‌شده با prior_art_index.py) را یک بار بارگذاری می‌کند """
+    from prior_art_index import PriorArtIndex
+    return PriorArtIndex.load(path)
+
+def show_portfolio_estimates(df, rubric_keys):
+    """ برآورد سهم سطوح پتانسیل و میانگین نمره هر طبقه با بازه اطمینان ۹۵٪ """
+    import pandas as pd
+    from portfolio_estimates import estimate_shares, estimate_means
+    processed = st.session_state.processed_rows
+    # تا پایان کار فقط ردیف‌های نمونه تصادفی در برآورد استفاده می‌شوند
+    used = processed if processed == len(df) else min(processed, st.session_state.sample_size)
+    if used == 0:
+        return
+    rows = st.session_state.order[:used]
+    category_key = result_key(rubric_keys, "innovation", innovation_rubric.CATEGORY_FIELD)
+    total_key = result_key(rubric_keys, "innovation", innovation_rubric.TOTAL_FIELD)
+    results = pd.DataFrame(st.session_state.results[:used]).reindex(columns=[category_key, total_key])
+    valid_categories = [category for _, category in innovation_rubric.POTENTIAL_THRESHOLDS]
+    categories = results[category_key].where(results[category_key].isin(valid_categories))
+
+    stratum_col = st.session_state.stratum_col
+    population = df[stratum_col] if stratum_col is not None else pd.Series(["همه"] * len(df))
+    strata = population.iloc[rows]
+
+    with st.container(border=True):
+        st.subheader("📊 برآورد سبد پایان‌نامه‌ها")
+        st.caption(f"بر اساس {used} ردیف از {len(df)} ({used / len(df):.1%})؛ بازه‌ها با اطمینان ۹۵٪ محاسبه شده‌اند.")
+        share_col, mean_col = st.columns(2)
+        share_col.dataframe(estimate_shares(categories, strata, population), hide_index=True)
+        mean_col.dataframe(estimate_means(results[total_key], strata, population), hide_index=True)
+
+def save_to_warehouse(final_df, rubric_keys, model_name, title_col, group_col):
+    """ نتایج کار تکمیل‌شده را برای گزارش‌های تاریخی به انبار ستونی (results_warehouse.py) اضافه می‌کند """
+    from results_warehouse import append_job
+    try:
+        n = append_job(final_df, rubric_keys, model_name, title_col=title_col, group_col=group_col)
+        st.session_state.warehouse_saved = True
+        st.caption(f"🗄️ {n} سطر امتیاز در انبار نتایج ذخیره شد (صفحه گزارش: streamlit run warehouse_app.py).")
+    except Exception as e:
+        st.warning(f"ذخیره نتایج در انبار ناموفق بود: {e}")
+
 def reset_analysis():
     """ تمام متغیرهای وضعیت جلسه را برای شروع مجدد پاک می‌کند """
     st.session_state.is_running = False
@@ -111,6 +140,19 @@ def reset_analysis():
     st.session_state.results = []
     st.session_state.final_df = None
     st.session_state.processed_rows = 0
+    st.session_state.local_results = None
+    st.session_state.local_confidence = None
+    st.session_state.local_rows = 0
+    st.session_state.prior_art = None
+    st.session_state.prior_art_context = None
+    st.session_state.order = None
+    st.session_state.sample_size = 0
+    st.session_state.model = None
+    st.session_state.extra_calls = 0
+    st.session_state.resampled_rows = 0
+    st.session_state.warehouse_saved = False
+    st.session_state.texts = None
+    st.session_state.text_summary = None
     st.session_state.uploader_key += 1 # این کار باعث ریست شدن ویجت آپلود فایل می‌شود
 
 # --- Streamlit App UI ---
@@ -124,16 +166,64 @@ api_key = st.sidebar.text_input("🔑 کلید API گوگل Gemini خود را 
 # --- دکمه بازنشانی (Reset) ---
 st.sidebar.button("🔄 بازنشانی کامل", on_click=reset_analysis, use_container_width=True)
 
+# --- انتخاب روبریک‌ها ---
+# با انتخاب چند روبریک، هر پایان‌نامه فقط با یک درخواست ترکیبی ارزیابی می‌شود
+rubric_keys = st.sidebar.multiselect(
+    "📋 روبریک‌های ارزیابی:", list(RUBRICS), default=["innovation"],
+    format_func=lambda key: RUBRICS[key].LABEL,
+    disabled=st.session_state.is_running,
+)
+
+# --- حالت امتیازدهی ---
+scoring_mode = st.sidebar.radio(
+    "⚙️ حالت امتیازدهی:", list(SCORING_MODES), format_func=SCORING_MODES.get,
+    disabled=st.session_state.is_running,
+)
+distilled_scorer = None
+if scoring_mode != "gemini":
+    model_path = st.sidebar.text_input("مسیر فایل مدل محلی:", value="distilled_model.joblib")
+    if scoring_mode == "hybrid":
+        confidence_threshold = st.sidebar.slider("حداقل اطمینان مدل محلی برای صرف‌نظر از Gemini:", 0.0, 1.0, 0.6, 0.05)
+    try:
+        distilled_scorer = load_distilled_scorer(model_path)
+    except Exception as e:
+        st.error(f"❌ خطا در بارگذاری مدل محلی: {e}")
+        st.stop()
+    if rubric_keys != [distilled_scorer.rubric_key]:
+        st.error(f"مدل محلی فقط برای روبریک «{distilled_scorer.rubric.LABEL}» آموزش دیده است؛ لطفاً فقط همین روبریک را انتخاب کنید.")
+        st.stop()
 
-if not api_key:
+# --- زمینه پیشینه (پایان‌نامه‌های مشابه قبلی) ---
+prior_art_index = None
+inject_prior_art = False
+if st.sidebar.checkbox("🔎 یافتن مشابه‌ترین پایان‌نامه‌های پیشین", disabled=st.session_state.is_running):
+    index_path = st.sidebar.text_input("مسیر فایل نمایه پیشینه:", value="prior_art_index.joblib")
+    inject_prior_art = st.sidebar.checkbox("افزودن پایان‌نامه‌های مشابه به دستور مدل", value=True)
+    try:
+        prior_art_index = load_prior_art_index(index_path)
+    except Exception as e:
+        st.error(f"❌ خطا در بارگذاری نمایه پیشینه: {e}")
+        st.stop()
+
+# --- نمونه‌گیری تطبیقی (self-consistency) ---
+# فقط ردیف‌هایی که نمره‌شان نزدیک مرز سطح پتانسیل است یا پاسخشان ناقص است دوباره ارزیابی می‌شوند
+adaptive = scoring_mode != "fast" and st.sidebar.checkbox(
+    "🎯 نمونه‌گیری مجدد ردیف‌های مرزی یا ناقص", disabled=st.session_state.is_running,
+    help="ردیف‌هایی که نمره نهایی‌شان نزدیک مرز یک سطح پتانسیل است (مثلاً ۴/۵ یا ۷/۸) یا پاسخشان ناقص است، تا رسیدن به توافق دوباره ارزیابی می‌شوند.",
+)
+if adaptive:
+    boundary_margin = st.sidebar.slider("فاصله از مرز سطح پتانسیل:", 1, 2, 1)
+    max_samples = st.sidebar.slider("حداکثر تعداد نمونه برای هر ردیف:", 2, 7, 5)
+
+# صفحه تا اینجا نمایش داده شده است؛ import کتابخانه‌های سنگین یک بار در پس‌زمینه شروع می‌شود
+warm_up()
+
+if not api_key and scoring_mode != "fast":
     st.warning("لطفاً برای شروع تحلیل، کلید API گوگل Gemini خود را در نوار کناری وارد کنید.")
     st.stop()
 
-try:
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash-latest')
-except Exception as e:
-    st.error(f"❌ خطا در تنظیم کلید API: لطفاً از معتبر بودن کلید خود اطمینان حاصل کنید.")
+if not rubric_keys:
+    st.warning("لطفاً حداقل یک روبریک ارزیابی را در نوار کناری انتخاب کنید.")
     st.stop()
 
 uploaded_file = st.file_uploader(
@@ -143,6 +233,9 @@ uploaded_file = st.file_uploader(
 )
 
 if uploaded_file is not None:
+    import pandas as pd
+    from results_view import show_latest_results, show_results_page
+    from text_normalization import prepare_texts, summary_message, STATUS_EMPTY, TEXT_STATUS_COLUMN
     try:
         df = pd.read_excel(uploaded_file)
         if st.session_state.final_df is None:
@@ -153,6 +246,29 @@ if uploaded_file is not None:
         columns = df.columns.tolist()
         title_col = st.sidebar.selectbox("ستون حاوی **عنوان** را انتخاب کنید:", columns, index=0)
         abstract_col = st.sidebar.selectbox("ستون حاوی **چکیده** را انتخاب کنید:", columns, index=1 if len(columns) > 1 else 0)
+        id_col = None
+        if prior_art_index is not None:
+            # با شناسه پایدار، پایان‌نامه‌ای که خودش در نمایه هست مشابه خودش گزارش نمی‌شود
+            id_col = st.sidebar.selectbox("ستون شناسه پایان‌نامه (مثلاً کد پایان‌نامه):", [None] + columns,
+                                          format_func=lambda c: "بدون شناسه" if c is None else str(c),
+                                          help="نمایه باید با همین شناسه‌ها ساخته شده باشد (prior_art_index.py build --id-col).")
+            if id_col is not None and not any(getattr(prior_art_index, "thesis_ids", [])):
+                st.sidebar.warning("نمایه پیشینه بدون شناسه ساخته شده است؛ آن را با --id-col دوباره بسازید.")
+
+        # --- ترتیب پردازش ---
+        schedule = st.sidebar.radio("🗂️ ترتیب پردازش:", list(SCHEDULES), format_func=SCHEDULES.get, disabled=st.session_state.is_running)
+        stratum_col = None
+        if schedule == "sample":
+            stratum_col = st.sidebar.selectbox("ستون طبقه‌بندی (مثلاً رشته یا دانشکده):", [None] + columns,
+                                               format_func=lambda c: "بدون طبقه‌بندی" if c is None else str(c))
+            sample_percent = st.sidebar.slider("درصد نمونه اولیه:", 1, 20, 5)
+
+        # --- انبار نتایج تاریخی ---
+        save_results = st.sidebar.checkbox("🗄️ ذخیره نتایج در انبار تاریخی", value=True)
+        group_col = None
+        if save_results:
+            group_col = st.sidebar.selectbox("ستون گروه برای گزارش‌ها (مثلاً دانشکده):", [None] + columns,
+                                             format_func=lambda c: "بدون گروه" if c is None else str(c))
 
         # --- دکمه‌های کنترل (شروع/توقف) ---
         col1, col2, _ = st.columns([1, 1, 4])
@@ -161,8 +277,51 @@ if uploaded_file is not None:
                 if title_col == abstract_col:
                     st.error("ستون عنوان و چکیده نمی‌توانند یکسان باشند.")
                 else:
+                    if api_key and scoring_mode != "fast":
+                        # مدل فقط هنگام شروع تحلیل ساخته می‌شود
+                        try:
+                            st.session_state.model = make_model(api_key)
+                        except Exception as e:
+                            st.error(f"❌ خطا در تنظیم کلید API: لطفاً از معتبر بودن کلید خود اطمینان حاصل کنید.")
+                            st.stop()
                     st.session_state.is_running = True
                     st.session_state.stop_requested = False
+                    st.session_state.local_results = None
+                    st.session_state.prior_art = None
+                    st.session_state.warehouse_saved = False
+                    # نرمال‌سازی و اعتبارسنجی برداری کل ستون‌ها پیش از هر فراخوانی API
+                    texts, st.session_state.text_summary = prepare_texts(df, title_col, abstract_col)
+                    st.session_state.texts = texts
+                    if st.session_state.order is None or st.session_state.processed_rows == 0:
+                        if schedule == "sample":
+                            from portfolio_estimates import stratified_order
+                            strata = df[stratum_col] if stratum_col is not None else None
+                            order, st.session_state.sample_size = stratified_order(strata, len(df), sample_percent / 100)
+                            st.session_state.order = order.tolist()
+                        else:
+                            st.session_state.order = list(range(len(df)))
+                            st.session_state.sample_size = 0
+                        st.session_state.stratum_col = stratum_col
+                    if prior_art_index is not None:
+                        # جستجوی دسته‌ای پایان‌نامه‌های مشابه برای کل فایل
+                        exclude_ids = df[id_col] if id_col is not None else None
+                        ids, scores = prior_art_index.search(texts["title"], texts["abstract"], k=3, exclude_ids=exclude_ids)
+                        st.session_state.prior_art = pd.Series(prior_art_index.describe(ids[:, :1], scores[:, :1]), name=prior_art_index.COLUMN)
+                        st.session_state.prior_art_context = prior_art_index.describe(ids, scores) if inject_prior_art else None
+                    if distilled_scorer is not None:
+                        # پیش‌بینی مدل محلی برای کل فایل در یک مرحله
+                        local_df, confidence = distilled_scorer.predict(texts["title"], texts["abstract"])
+                        # ردیف‌های بدون عنوان یا چکیده امتیاز ساختگی نمی‌گیرند
+                        st.session_state.local_results = [
+                            empty_result(rubric_keys, "عنوان یا چکیده موجود نیست.") if status == STATUS_EMPTY else result
+                            for result, status in zip(local_df.to_dict('records'), texts[TEXT_STATUS_COLUMN])
+                        ]
+                        st.session_state.local_confidence = confidence.tolist()
+                        if scoring_mode == "fast":
+                            st.session_state.results = [st.session_state.local_results[j] for j in st.session_state.order]
+                            st.session_state.processed_rows = len(df)
+                            st.session_state.local_rows = len(df) - st.session_state.text_summary[STATUS_EMPTY]
+                            st.session_state.is_running = False
                     st.rerun() # اجرای مجدد اسکریپت برای شروع حلقه پردازش
         else:
             if col2.button("⏹️ توقف تحلیل", use_container_width=True):
@@ -171,6 +330,10 @@ if uploaded_file is not None:
                 sleep(1) # فرصت برای نمایش پیام
                 st.rerun()
 
+        # --- برآورد زودهنگام سبد (در حالت نمونه‌گیری طبقه‌بندی‌شده) ---
+        if st.session_state.sample_size and st.session_state.results and "innovation" in rubric_keys:
+            show_portfolio_estimates(df, rubric_keys)
+
         # --- حلقه اصلی پردازش ---
         if st.session_state.is_running and not st.session_state.stop_requested:
             total_rows = len(df)
@@ -178,21 +341,42 @@ if uploaded_file is not None:
             
             i = st.session_state.processed_rows
             if i < total_rows:
-                row = df.iloc[i]
-                title = str(row.get(title_col, ''))
-                abstract = str(row.get(abstract_col, ''))
-                
-                # ... (منطق پردازش یک ردیف مانند قبل)
-                prompt = create_prompt(title, abstract)
-                try:
-                    response = model.generate_content(prompt)
-                    parsed_data = parse_response(response.text)
-                    st.session_state.results.append(parsed_data)
-                except Exception as e:
-                     st.error(f"خطا در ردیف {i+1}: {e}")
-                     st.session_state.results.append({"تحلیل کلی": f"خطا: {e}"})
-                
-                sleep(1) # تاخیر برای جلوگیری از محدودیت API
+                # فقط چند نتیجه آخر نمایش داده می‌شود تا هزینه هر به‌روزرسانی ثابت بماند
+                show_latest_results(st.session_state.results)
+
+                row_idx = st.session_state.order[i] # شماره ردیف در فایل بر اساس ترتیب پردازش
+                title, abstract, status = st.session_state.texts.iloc[row_idx]
+
+                if status == STATUS_EMPTY:
+                    # ردیف بدون عنوان یا چکیده (خالی، NaN یا «nan») به مدل ارسال نمی‌شود
+                    st.session_state.results.append(empty_result(rubric_keys, "عنوان یا چکیده موجود نیست."))
+                elif st.session_state.local_results is not None and st.session_state.local_confidence[row_idx] >= confidence_threshold:
+                    # مدل محلی به اندازه کافی مطمئن است؛ فراخوانی API لازم نیست
+                    st.session_state.results.append(st.session_state.local_results[row_idx])
+                    st.session_state.local_rows += 1
+                else:
+                    # ... (منطق پردازش یک ردیف مانند قبل)
+                    prior_art = st.session_state.prior_art_context[row_idx] if st.session_state.prior_art_context else None
+                    prompt = create_prompt(title, abstract, rubric_keys, prior_art=prior_art)
+                    try:
+                        if adaptive:
+                            from self_consistency import score_adaptive, SAMPLES_COLUMN
+                            parsed_data, calls = score_adaptive(
+                                lambda p: st.session_state.model.generate_content(p).text,
+                                prompt, rubric_keys, margin=boundary_margin, max_samples=max_samples,
+                            )
+                            parsed_data[SAMPLES_COLUMN] = calls
+                            st.session_state.extra_calls += calls - 1
+                            st.session_state.resampled_rows += calls > 1
+                        else:
+                            response = st.session_state.model.generate_content(prompt)
+                            parsed_data = parse_response(response.text, rubric_keys)
+                        st.session_state.results.append(parsed_data)
+                    except Exception as e:
+                         st.error(f"خطا در ردیف {row_idx+1}: {e}")
+                         st.session_state.results.append(empty_result(rubric_keys, f"خطا: {e}"))
+
+                    sleep(1) # تاخیر برای جلوگیری از محدودیت API
                 st.session_state.processed_rows += 1
                 progress_bar.progress(st.session_state.processed_rows / total_rows, text=f"در حال پردازش ردیف {st.session_state.processed_rows} از {total_rows}")
                 st.rerun() # اجرای مجدد برای پردازش ردیف بعدی
@@ -205,24 +389,45 @@ if uploaded_file is not None:
                  st.info(f"تحلیل پس از پردازش {st.session_state.processed_rows} ردیف متوقف شد.")
             else:
                  st.success("🎉 تحلیل با موفقیت انجام شد!")
+            if st.session_state.text_summary is not None:
+                 st.info(summary_message(st.session_state.text_summary))
+            if st.session_state.local_rows:
+                 st.info(f"⚡ {st.session_state.local_rows} ردیف با مدل محلی امتیازدهی شد و به فراخوانی API نیاز نداشت.")
+            if st.session_state.resampled_rows:
+                 api_rows = max(1, st.session_state.processed_rows - st.session_state.local_rows)
+                 st.info(f"🎯 {st.session_state.resampled_rows} ردیف مرزی یا ناقص دوباره نمونه‌گیری شد: "
+                         f"{st.session_state.extra_calls} فراخوانی اضافه ({st.session_state.extra_calls / api_rows:.0%} "
+                         f"بیشتر از یک فراخوانی برای هر ردیف).")
 
-            results_df = pd.DataFrame(st.session_state.results)
-            results_df.rename(columns={
-                "حوزه علمی": "امتیاز حوزه علمی", "فناوری خاص": "امتیاز فناوری خاص",
-                "حل مسئله": "امتیاز حل مسئله", "تجاری‌سازی": "امتیاز تجاری‌سازی",
-                "همکاری": "امتیاز همکاری",
-            }, inplace=True)
-            
-            # فقط ردیف‌های پردازش شده را با نتایجشان ترکیب کن
-            processed_df = df.iloc[:st.session_state.processed_rows]
-            st.session_state.final_df = pd.concat([processed_df.reset_index(drop=True), results_df.reset_index(drop=True)], axis=1)
+            # جدول نهایی فقط یک بار (یا پس از ادامه تحلیل متوقف‌شده) ساخته می‌شود
+            final_df = st.session_state.final_df
+            if final_df is None or len(final_df) != st.session_state.processed_rows:
+                results_df = pd.DataFrame(st.session_state.results)
+                results_df.rename(columns=result_columns(rubric_keys), inplace=True)
+                order = st.session_state.order[:st.session_state.processed_rows]
+                if st.session_state.prior_art is not None:
+                    prior_art = st.session_state.prior_art
+                    results_df[prior_art.name] = prior_art.iloc[order].to_numpy()
+                if st.session_state.texts is not None:
+                    results_df[TEXT_STATUS_COLUMN] = st.session_state.texts[TEXT_STATUS_COLUMN].iloc[order].to_numpy()
+
+                # فقط ردیف‌های پردازش شده را با نتایجشان ترکیب کن و به ترتیب فایل ورودی برگردان
+                processed_df = df.iloc[order]
+                final_df = pd.concat([processed_df.reset_index(drop=True), results_df.reset_index(drop=True)], axis=1)
+                final_df.index = order
+                st.session_state.final_df = final_df.sort_index().reset_index(drop=True)
+
+            # فقط کارهای کامل (نه متوقف‌شده) و هر کار فقط یک بار در انبار ثبت می‌شود
+            if save_results and not st.session_state.stop_requested and not st.session_state.warehouse_saved:
+                model_name = {"gemini": MODEL_NAME, "fast": "distilled-local",
+                              "hybrid": f"hybrid:distilled-local+{MODEL_NAME}"}[scoring_mode]
+                save_to_warehouse(st.session_state.final_df, rubric_keys, model_name, title_col, group_col)
         
         if st.session_state.final_df is not None:
-            st.dataframe(st.session_state.final_df)
-            excel_data = to_excel(st.session_state.final_df)
+            show_results_page(st.session_state.final_df)
             st.download_button(
                 label="📥 دانلود فایل اکسل نتایج",
-                data=excel_data,
+                data=partial(to_excel, st.session_state.final_df), # فایل فقط هنگام کلیک ساخته می‌شود
                 file_name="تحلیل_نوآوری_پایان‌نامه‌ها.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
@@ -0,0 +1,101 @@
+"""
+روبریک «جدول ارزیابی اثبات مفهوم برای رتبه‌بندی نوآوری» (۵ شاخص).
+این ماژول بدون وابستگی به Streamlit است تا هم در اپلیکیشن و هم در پردازش‌های دسته‌ای قابل استفاده باشد.
+"""
+
+# نام نمایشی روبریک (پیشوند ستون‌ها در ارزیابی چندروبریکی)
+LABEL = "نوآوری ۵ شاخصه"
+
+# نام ستون‌های خروجی در فایل نهایی
+RESULT_COLUMNS = {
+    "حوزه علمی": "امتیاز حوزه علمی", "فناوری خاص": "امتیاز فناوری خاص",
+    "حل مسئله": "امتیاز حل مسئله", "تجاری‌سازی": "امتیاز تجاری‌سازی",
+    "همکاری": "امتیاز همکاری",
+}
+
+# شاخص‌های عددی و حداکثر امتیاز هر کدام
+SCORE_FIELDS = {"حوزه علمی": 3, "فناوری خاص": 3, "حل مسئله": 3, "تجاری‌سازی": 3, "همکاری": 1}
+TOTAL_FIELD = "نمره نهایی"
+CATEGORY_FIELD = "پتانسیل نوآوری"
+
+# حد پایین نمره نهایی برای هر سطح پتانسیل (مطابق دستور مدل)
+POTENTIAL_THRESHOLDS = [(8, "بالا"), (5, "متوسط"), (0, "ضعیف")]
+
+
+def potential_category(total):
+    """ سطح پتانسیل نوآوری را از روی نمره نهایی تعیین می‌کند. """
+    for threshold, category in POTENTIAL_THRESHOLDS:
+        if total >= threshold:
+            return category
+    return POTENTIAL_THRESHOLDS[-1][1]
+
+
+ROLE = "شما یک متخصص ارزیابی نوآوری و انتقال فناوری هستید."
+
+CRITERIA = """وظیفه شما تحلیل عنوان و چکیده پایان‌نامه زیر بر اساس **"جدول ارزیابی اثبات مفهوم برای رتبه‌بندی نوآوری"** است.
+        برای هر یک از ۵ شاخص زیر، یک امتیاز بر اساس توضیحات داده شده اختصاص دهید و در نهایت نمره کل و پتانسیل نوآوری را مشخص کنید.
+
+        **شاخص‌ها و نحوه امتیازدهی:**
+
+        1.  **حوزه علمی پایان‌نامه (امتیاز ۰ تا ۳):** آیا در حوزه‌هایی است که بیشترین ارجحیت را دارند؟ (مانند: داروسازی، مهندسی علوم زیستی، مواد، پزشکی و...). اگر در حوزه‌های با اولویت بالا بود امتیاز ۳، متوسط ۲، کم ۱ و نامرتبط ۰ بدهید.
+        2.  **استفاده از فناوری با نوآوری خاص (امتیاز ۰ تا ۳):** آیا چکیده به تکنولوژی نو، مدل فنی، محصول، الگوریتم، فرآیند، یا متدولوژی جدید اشاره دارد؟ اگر اشاره واضحی داشت امتیاز ۳، اشاره ضمنی ۱، و در غیر این صورت ۰ بدهید.
+        3.  **حل مسئله صنعتی/اجتماعی مشخص (امتیاز ۰ تا ۳):** آیا در چکیده به یک نیاز یا مسئله کاربردی خاص اشاره شده است؟ اگر مسئله کاملاً مشخص و کاربردی است امتیاز ۳، اگر کلی است ۱ و در غیر این صورت ۰ بدهید.
+        4.  **قابلیت تجاری‌سازی (امتیاز ۰ تا ۳):** آیا پایان‌نامه به نتایج ملموسی که قابل توسعه به محصول، نرم‌افزار، یا دستگاه باشد، اشاره می‌کند؟ اگر پتانسیل مستقیم دارد امتیاز ۳، پتانسیل غیرمستقیم ۱ و در غیر این صورت ۰ بدهید.
+        5.  **همکاری با صنعت/نهاد غیردانشگاهی (امتیاز ۰ یا ۱):** آیا چکیده نشان می‌دهد با یک نهاد صنعتی یا سازمانی همکاری شده است؟ اگر بله ۱، اگر نه ۰.
+
+        **تحلیل و خروجی:**
+        پس از امتیازدهی به هر شاخص، نمره نهایی را از جمع امتیازات محاسبه کنید.
+        سپس بر اساس نمره نهایی، "پتانسیل نوآوری" را طبقه‌بندی کنید:
+        - **پتانسیل بالا:** نمره ۸ تا ۱۰ (و بالاتر)
+        - **پتانسیل متوسط:** نمره ۵ تا ۷
+        - **پتانسیل ضعیف:** نمره کمتر از ۵
+
+        در انتها یک تحلیل کلی مختصر (حداکثر ۲ جمله) برای توجیه امتیازات ارائه دهید."""
+
+OUTPUT_FORMAT = """حوزه علمی: [امتیاز]/3
+        فناوری خاص: [امتیاز]/3
+        حل مسئله: [امتیاز]/3
+        تجاری‌سازی: [امتیاز]/3
+        همکاری: [امتیاز]/1
+        نمره نهایی: [جمع امتیازات]
+        پتانسیل نوآوری: [ضعیف/متوسط/بالا]
+        تحلیل کلی: [خلاصه تحلیل شما در اینجا]"""
+
+
+def create_prompt(title, abstract):
+    # این تابع بدون تغییر باقی می‌ماند
+    return f"""
+        {ROLE}
+        {CRITERIA}
+
+        خروجی را **دقیقا** با فرمت زیر و فقط به زبان فارسی ارائه دهید:
+
+        {OUTPUT_FORMAT}
+
+        ---
+        **عنوان پایان‌نامه:** {title}
+
+        **چکیده پایان‌نامه:** {abstract}
+        ---
+    """
+
+def parse_response(text):
+    # این تابع بدون تغییر باقی می‌ماند
+    data = {
+        "حوزه علمی": "N/A", "فناوری خاص": "N/A", "حل مسئله": "N/A",
+        "تجاری‌سازی": "N/A", "همکاری": "N/A", "نمره نهایی": "N/A",
+        "پتانسیل نوآوری": "N/A", "تحلیل کلی": "خطا در پردازش پاسخ مدل."
+    }
+    try:
+        lines = text.strip().split('\n')
+        for line in lines:
+            if "حوزه علمی:" in line: data["حوزه علمی"] = line.split(':')[1].strip().split('/')[0]
+            elif "فناوری خاص:" in line: data["فناوری خاص"] = line.split(':')[1].strip().split('/')[0]
+            elif "حل مسئله:" in line: data["حل مسئله"] = line.split(':')[1].strip().split('/')[0]
+            elif "تجاری‌سازی:" in line: data["تجاری‌سازی"] = line.split(':')[1].strip().split('/')[0]
+            elif "همکاری:" in line: data["همکاری"] = line.split(':')[1].strip().split('/')[0]
+            elif "نمره نهایی:" in line: data["نمره نهایی"] = line.split(':')[1].strip()
+            elif "پتانسیل نوآوری:" in line: data["پتانسیل نوآوری"] = line.split(':')[1].strip()
+            elif "تحلیل کلی:" in line: data["تحلیل کلی"] = line.split(':', 1)[1].strip()
+    except Exception: pass
+    return data
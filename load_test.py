@@ -0,0 +1,322 @@
+"""
+آزمون بار و پروفایل حافظه چند جلسه همزمان برای اپلیکیشن‌های Streamlit (بدون مرورگر).
+
+N جلسه مستقل با AppTest و یک مدل ساختگی (بدون فراخوانی API) مسیر کامل بارگذاری فایل →
+تحلیل → دانلود اکسل را طی می‌کنند؛ جلسه‌ها تا پایان آزمون زنده نگه داشته می‌شوند (مانند
+سروری که session_state همه کاربران را نگه می‌دارد). AppTest در هر پردازش فقط یک اجرای
+اسکریپت در هر لحظه را پشتیبانی می‌کند، بنابراین جلسه‌ها یکی پس از دیگری اجرا می‌شوند و زمان هر
+اجرای مجدد (rerun) بدون رقابت با جلسه‌های دیگر اندازه‌گیری می‌شود (هزینه هر جلسه، نه تاخیر زیر بار).
+برای هر جلسه این زمان‌ها و برای کل آزمون زمان CPU، رشد RSS و حافظه ردیابی‌شده با tracemalloc گزارش می‌شود؛
+با آستانه‌های --max-session-mb و --max-p95-ms می‌توان از آن برای تعیین اندازه pod و
+شناسایی پسرفت حافظه در CI استفاده کرد (کد خروج ۱ در صورت عبور از آستانه).
+
+app ساختگی streamlit_app.py فقط یک صفحه HTML ثابت است و تحلیل آن در مرورگر انجام می‌شود؛
+برای آن فقط هزینه اجرای صفحه در سرور اندازه‌گیری می‌شود.
+
+نمونه اجرا:
+    python load_test.py gemini_thesis_analysis_app.py --sessions 8 --rows 100
+    python load_test.py Thesis_Analyzer_App.py --sessions 16 --model-latency 0.05 --out report.json
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from rubrics import RUBRICS
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_APPS = ["Thesis_Analyzer_App.py", "gemini_thesis_analysis_app.py", "streamlit_app.py"]
+API_KEY = "load-test"
+MB = 1024 ** 2
+
+DOWNLOAD_KEY = "_load_test_download"
+RERUNS_KEY = "_load_test_reruns"
+
+_real_sleep = time.sleep
+
+# اسکریپتی که AppTest اجرا می‌کند: اپلیکیشن اصلی با همان نام ماژول __main__.
+# AppTest اجراهای مجدد ناشی از st.rerun را درون همان run انجام می‌دهد، پس زمان و CPU هر
+# اجرای اسکریپت همین‌جا ثبت می‌شود.
+_WRAPPER = """
+import runpy, time
+import streamlit as st
+_start, _cpu = time.perf_counter(), time.thread_time()
+try:
+    runpy.run_path({app!r}, run_name="__main__")
+finally:
+    st.session_state.setdefault({key!r}, []).append(
+        (time.perf_counter() - _start, time.thread_time() - _cpu))
+"""
+
+
+# --- مدل و ورودی ساختگی ---
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class MockModel:
+    """
+    جایگزین genai.GenerativeModel: برای هر روبریکی که معیارهایش در دستور آمده، پاسخی با
+    فرمت مورد انتظار parse_response همان روبریک و امتیازهای شبه‌تصادفی (وابسته به متن دستور) می‌سازد.
+    """
+
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, prompt):
+        if self.latency:
+            _real_sleep(self.latency)
+        rng = random.Random(zlib.crc32(prompt.encode()))
+        selected = [(key, rubric) for key, rubric in RUBRICS.items() if rubric.CRITERIA in prompt]
+        sections = []
+        for key, rubric in selected:
+            scores = {field: rng.randint(0, top) for field, top in rubric.SCORE_FIELDS.items()}
+            lines = [f"### {key}"] if len(selected) > 1 else []
+            lines += [f"{field}: {score}/{rubric.SCORE_FIELDS[field]}" for field, score in scores.items()]
+            if getattr(rubric, "TOTAL_FIELD", None):
+                total = sum(scores.values())
+                lines.append(f"{rubric.TOTAL_FIELD}: {total}")
+                lines.append(f"{rubric.CATEGORY_FIELD}: {rubric.potential_category(total)}")
+            lines.append("تحلیل کلی: " + "پاسخ ساختگی آزمون بار. " * rng.randint(5, 20))
+            sections.append("\n".join(lines))
+        return _Response("\n\n".join(sections))
+
+
+def make_input(path, rows, abstract_chars=1500, seed=0):
+    """ فایل اکسل ساختگی با ستون‌های عنوان، چکیده و دانشکده. """
+    rng = np.random.default_rng(seed)
+    words = np.array("نانو دارو سلول بیماری درمان مدل داده سامانه پلیمر ژن پروتئین تصویر تشخیص "
+                     "حسگر بافت ایمنی کاتالیست غشا سرطان باکتری مقاومت رهایش".split())
+    faculties = ["داروسازی", "پزشکی", "فنی", "علوم پایه", "پیراپزشکی"]
+    n_words = max(1, abstract_chars // 6)
+    pd.DataFrame({
+        "عنوان": [f"پایان‌نامه {i}: " + " ".join(rng.choice(words, 8)) for i in range(rows)],
+        "چکیده": [" ".join(rng.choice(words, n_words)) for _ in range(rows)],
+        "دانشکده": rng.choice(faculties, rows),
+    }).to_excel(path, index=False)
+    return path
+
+
+def install_mocks(input_path, model_latency=0.0):
+    """
+    genai، تاخیرهای sleep، file_uploader و download_button را در همین پردازش جایگزین می‌کند.
+    همه جلسه‌ها یک فایل ورودی را بارگذاری می‌کنند؛ داده دانلود هر جلسه در session_state همان جلسه نگه داشته می‌شود.
+    """
+    import google.generativeai as genai
+    import streamlit as st
+
+    MockModel.latency = model_latency
+    genai.GenerativeModel = MockModel
+    genai.configure = lambda **kwargs: None
+    time.sleep = lambda seconds: None  # تاخیرهای محدودیت API در اپلیکیشن‌ها
+    with open(input_path, "rb") as f:
+        content = f.read()
+
+    original_uploader = st.file_uploader
+    original_download = st.download_button
+
+    def file_uploader(*args, **kwargs):
+        original_uploader(*args, **kwargs)
+        uploaded = io.BytesIO(content)
+        uploaded.name = os.path.basename(input_path)
+        uploaded.file_id = input_path  # مانند UploadedFile؛ اپلیکیشن‌ها با آن تغییر فایل را تشخیص می‌دهند
+        return uploaded
+
+    def download_button(label, data, *args, **kwargs):
+        st.session_state[DOWNLOAD_KEY] = data
+        return original_download(label, data, *args, **kwargs)
+
+    st.file_uploader = file_uploader
+    st.download_button = download_button
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+
+
+# --- اندازه‌گیری ---
+
+def _rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # فقط حداکثر RSS در دسترس است
+
+
+class _PeakSampler(threading.Thread):
+    """ نمونه‌برداری دوره‌ای RSS برای یافتن بیشینه در طول آزمون. """
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, _rss())
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+def _session_state(at, key, default=None):
+    try:
+        return at.session_state[key]
+    except KeyError:
+        return default
+
+
+def run_session(app_path, timeout=120, max_reruns=100000):
+    """
+    یک جلسه کامل: بارگذاری، ورود کلید API، شروع تحلیل، اجرای مجدد تا پایان و دانلود.
+    خروجی: (شیء AppTest برای زنده نگه داشتن جلسه، آمار جلسه).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_string(_WRAPPER.format(app=os.path.abspath(app_path), key=RERUNS_KEY),
+                             default_timeout=timeout)
+
+    def run(step=None):
+        (step or at.run)()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+
+    started = time.perf_counter()
+    run()
+    if len(at.sidebar.text_input):
+        run(lambda: at.sidebar.text_input[0].set_value(API_KEY).run())
+    start_buttons = [b for b in at.button if "شروع" in b.label]
+    if start_buttons:
+        run(lambda: start_buttons[0].click().run())
+    while _session_state(at, "is_running", False) and len(_session_state(at, RERUNS_KEY, [])) < max_reruns:
+        run()
+
+    reruns = np.array(_session_state(at, RERUNS_KEY, []))
+    stats = {"reruns": len(reruns), "wall_s": time.perf_counter() - started, "cpu_s": reruns[:, 1].sum()}
+    final_df = _session_state(at, "final_df")
+    stats["rows"] = 0 if final_df is None else len(final_df)
+    # دانلود همان‌طور که هنگام کلیک کاربر اجرا می‌شود (ساخت بایت‌های اکسل)
+    data = _session_state(at, DOWNLOAD_KEY)
+    if data is not None:
+        start = time.perf_counter()
+        payload = data() if callable(data) else data
+        stats["download_s"] = time.perf_counter() - start
+        stats["download_mb"] = len(payload) / MB
+    lat = reruns[:, 0] * 1000
+    stats.update({"p50_ms": np.percentile(lat, 50), "p95_ms": np.percentile(lat, 95), "max_ms": lat.max()})
+    return at, stats
+
+
+def load_test(app_path, sessions=4, timeout=120, trace_memory=True):
+    """
+    sessions جلسه را یکی پس از دیگری اجرا کرده (همه تا پایان زنده می‌مانند) و آمار هر جلسه و خلاصه
+    حافظه/CPU را برمی‌گرداند. AppTest در هر پردازش فقط یک اجرای اسکریپت در هر لحظه را پشتیبانی
+    می‌کند، پس زمان‌ها بدون رقابت بین جلسه‌ها اندازه‌گیری می‌شوند.
+    یک جلسه گرم‌کننده ابتدا اجرا می‌شود تا هزینه import و کش‌ها در رشد حافظه هر جلسه حساب نشود.
+    tracemalloc اجرای اسکریپت را چند برابر کند می‌کند؛ برای اندازه‌گیری دقیق زمان‌ها trace_memory=False بدهید.
+    """
+    run_session(app_path, timeout)
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    base_rss, (base_traced, _) = _rss(), tracemalloc.get_traced_memory()
+    sampler = _PeakSampler()
+    sampler.start()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+    outcomes = [run_session(app_path, timeout) for _ in range(sessions)]
+
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    gc.collect()
+    live_rss, (live_traced, peak_traced) = _rss(), tracemalloc.get_traced_memory()
+    # آزاد کردن جلسه‌ها برای تشخیص حافظه‌ای که پس از بسته شدن جلسه‌ها باقی می‌ماند
+    per_session = pd.DataFrame([stats for _, stats in outcomes])
+    del outcomes
+    gc.collect()
+    released_rss, (released_traced, _) = _rss(), tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = sampler.stop()
+
+    summary = {
+        "app": os.path.basename(app_path), "sessions": sessions,
+        "latency": "per session, no contention (one script run at a time)",
+        "wall_s": wall, "cpu_s": cpu, "cpu_utilisation": cpu / wall if wall else 0.0,
+        "p95_ms": float(per_session["p95_ms"].max()),
+        "base_rss_mb": base_rss / MB, "peak_rss_mb": peak_rss / MB, "live_rss_mb": live_rss / MB,
+        "rss_per_session_mb": (live_rss - base_rss) / MB / sessions,
+        "rss_after_close_mb": released_rss / MB,
+    }
+    if trace_memory:
+        summary.update({
+            "traced_per_session_mb": (live_traced - base_traced) / MB / sessions,
+            "traced_peak_mb": (peak_traced - base_traced) / MB,
+            "retained_after_close_mb": (released_traced - base_traced) / MB,
+        })
+    return per_session, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="آزمون بار و پروفایل حافظه جلسه‌های همزمان اپلیکیشن‌های Streamlit")
+    parser.add_argument("apps", nargs="*", default=DEFAULT_APPS)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=50, help="تعداد ردیف فایل ساختگی")
+    parser.add_argument("--abstract-chars", type=int, default=1500)
+    parser.add_argument("--input", help="فایل اکسل واقعی به جای فایل ساختگی")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="تاخیر ساختگی هر فراخوانی مدل (ثانیه)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--no-tracemalloc", action="store_true", help="اندازه‌گیری زمان بدون سربار tracemalloc")
+    parser.add_argument("--max-session-mb", type=float, help="حداکثر مجاز رشد حافظه هر جلسه (tracemalloc یا RSS)")
+    parser.add_argument("--max-p95-ms", type=float, help="حداکثر مجاز صدک ۹۵ زمان اجرای مجدد")
+    parser.add_argument("--out", help="ذخیره گزارش به صورت JSON")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="thesis_load_test_")
+    input_path = args.input or make_input(os.path.join(workdir, "input.xlsx"), args.rows, args.abstract_chars)
+    install_mocks(os.path.abspath(input_path), args.model_latency)
+    apps = [os.path.join(APP_DIR, app) if not os.path.isabs(app) else app for app in args.apps]
+    os.chdir(workdir)  # فایل‌های جانبی (مثلاً انبار نتایج) در پوشه موقت ساخته می‌شوند
+
+    report, failed = [], False
+    for app in apps:
+        per_session, summary = load_test(app, args.sessions, args.timeout, not args.no_tracemalloc)
+        report.append({"summary": summary, "sessions": per_session.to_dict("records")})
+        with pd.option_context("display.width", 200, "display.float_format", "{:.2f}".format):
+            print(f"\n=== {summary['app']} ===")
+            print(per_session)
+            print(pd.Series(summary).to_string())
+        growth = summary.get("traced_per_session_mb", summary["rss_per_session_mb"])
+        if args.max_session_mb is not None and growth > args.max_session_mb:
+            print(f"❌ رشد حافظه هر جلسه ({growth:.1f} MB) از آستانه بیشتر است.")
+            failed = True
+        if args.max_p95_ms is not None and summary["p95_ms"] > args.max_p95_ms:
+            print(f"❌ صدک ۹۵ زمان اجرای مجدد ({summary['p95_ms']:.0f} ms) از آستانه بیشتر است.")
+            failed = True
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=float)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
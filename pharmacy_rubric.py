@@ -0,0 +1,78 @@
+"""
+روبریک سه‌معیاره پایان‌نامه‌های داروسازی (نوآوری، تجاری‌سازی، ارزش‌آفرینی).
+این ماژول بدون وابستگی به Streamlit است تا هم در اپلیکیشن و هم در پردازش‌های دسته‌ای قابل استفاده باشد.
+"""
+
+# نام نمایشی روبریک (پیشوند ستون‌ها در ارزیابی چندروبریکی)
+LABEL = "داروسازی ۳ معیاره"
+
+# نام ستون‌های خروجی در فایل نهایی
+RESULT_COLUMNS = {
+    "نوآوری": "امتیاز نوآوری",
+    "تجاری‌سازی": "امتیاز تجاری‌سازی",
+    "ارزش‌آفرینی": "امتیاز ارزش‌آفرینی",
+    "تحلیل کلی": "خلاصه تحلیل هوش مصنوعی"
+}
+
+# معیارهای عددی و حداکثر امتیاز هر کدام
+SCORE_FIELDS = {"نوآوری": 10, "تجاری‌سازی": 10, "ارزش‌آفرینی": 10}
+
+ROLE = "شما یک متخصص نخبه در زمینه علوم دارویی، توسعه کسب‌وکار و انتقال فناوری هستید."
+
+CRITERIA = """وظیفه شما تحلیل عنوان و چکیده پایان‌نامه زیر از رشته داروسازی است.
+        آن را بر اساس سه معیار اصلی با دقت ارزیابی کنید:
+        1.  **پتانسیل تجاری‌سازی (Commercialization Potential):** آیا این ایده می‌تواند به یک محصول، سرویس یا پتنت سودآور تبدیل شود؟ بازار هدف آن چیست؟
+        2.  **سطح نوآوری (Innovation Level):** آیا این تحقیق یک رویکرد جدید، روش نوین یا کشف بدیع را ارائه می‌دهد؟ در مقایسه با دانش موجود چقدر نوآورانه است؟
+        3.  **پتانسیل ارزش‌آفرینی (Value Creation Potential):** این تحقیق چه مشکلی را حل می‌کند؟ چه ارزشی برای بیماران، صنعت داروسازی یا جامعه علمی ایجاد می‌کند؟
+
+        برای هر معیار یک امتیاز از ۱ تا ۱۰ بدهید. سپس یک تحلیل کلی و مختصر (حداکثر ۲-۳ جمله) ارائه دهید."""
+
+OUTPUT_FORMAT = """نوآوری: [امتیاز]/10
+        تجاری‌سازی: [امتیاز]/10
+        ارزش‌آفرینی: [امتیاز]/10
+        تحلیل کلی: [خلاصه تحلیل شما در اینجا]"""
+
+
+def create_prompt(title, abstract):
+    """
+    این تابع یک دستور (prompt) دقیق برای مدل هوش مصنوعی ایجاد می‌کند.
+    """
+    return f"""
+        {ROLE}
+        {CRITERIA}
+        خروجی را **دقیقا** با فرمت زیر و فقط به زبان فارسی ارائه دهید:
+
+        {OUTPUT_FORMAT}
+
+        ---
+        **عنوان پایان‌نامه:** {title}
+
+        **چکیده پایان‌نامه:** {abstract}
+        ---
+    """
+
+def parse_response(text):
+    """
+    این تابع پاسخ ساختاریافته مدل هوش مصنوعی را تجزیه کرده و امتیازها و خلاصه را استخراج می‌کند.
+    """
+    data = {
+        "نوآوری": "N/A",
+        "تجاری‌سازی": "N/A",
+        "ارزش‌آفرینی": "N/A",
+        "تحلیل کلی": "خطا در پردازش پاسخ مدل."
+    }
+    try:
+        lines = text.strip().split('\n')
+        for line in lines:
+            if "نوآوری:" in line:
+                data["نوآوری"] = line.split(':')[1].strip().split('/')[0]
+            elif "تجاری‌سازی:" in line:
+                data["تجاری‌سازی"] = line.split(':')[1].strip().split('/')[0]
+            elif "ارزش‌آفرینی:" in line:
+                data["ارزش‌آفرینی"] = line.split(':')[1].strip().split('/')[0]
+            elif "تحلیل کلی:" in line:
+                data["تحلیل کلی"] = line.split(':', 1)[1].strip()
+    except Exception:
+        # در صورت بروز خطا در تجزیه، از پیام پیش‌فرض استفاده می‌شود.
+        pass
+    return data
@@ -0,0 +1,218 @@
+"""
+نمایه شباهت پیشینه (prior-art) روی عنوان و چکیده همه پایان‌نامه‌های قبلی.
+
+متن‌ها با n-gramهای کلمه‌ای هش‌شده + TF-IDF و کاهش بعد (LSA) به بردارهای متراکم کوچک تبدیل
+می‌شوند و در یک نمایه خوشه‌ای تقریبی (IVF) نگهداری می‌شوند: هر پرس‌وجو فقط با بردارهای
+چند خوشه نزدیک (nprobe) مقایسه می‌شود، بنابراین جستجوی دسته‌ای حتی با صدها هزار پایان‌نامه
+کمتر از یک میلی‌ثانیه برای هر ردیف طول می‌کشد. پایان‌نامه‌های جدید بدون آموزش مجدد به
+نزدیک‌ترین خوشه اضافه می‌شوند.
+
+نمونه اجرا:
+    python prior_art_index.py build archive.xlsx --title-col عنوان --abstract-col چکیده
+    python prior_art_index.py add theses_1403.xlsx --title-col عنوان --abstract-col چکیده
+    python prior_art_index.py query theses_1404.xlsx --title-col عنوان --abstract-col چکیده --out similar.xlsx
+
+با --id-col (شناسه پایدار پایان‌نامه، مثلاً کد پایان‌نامه) هنگام ساخت نمایه و پرس‌وجو، خود پایان‌نامه
+از نتایج حذف می‌شود؛ بدون آن هیچ نتیجه‌ای حذف نمی‌شود (حتی اگر عنوان و چکیده یکسان باشند).
+"""
+
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+from text_normalization import normalize
+
+DEFAULT_INDEX_PATH = "prior_art_index.joblib"
+PRIOR_ART_COLUMN = "مشابه‌ترین پایان‌نامه پیشین"
+
+
+def _clean(values):
+    # همان نرمال‌سازی پیش از ساخت دستور تا نمایه و پرس‌وجو (مثلاً ي/ی و ك/ک) یکسان هش شوند
+    return normalize(pd.Series(values).reset_index(drop=True))
+
+
+def _thesis_ids(ids, n):
+    # شناسه پایدار هر پایان‌نامه برای حذف خود آن از نتایج؛ رشته خالی یعنی بدون شناسه
+    if ids is None:
+        return np.full(n, "", dtype=object)
+    return pd.Series(ids).reset_index(drop=True).fillna('').astype(str).str.strip().to_numpy(dtype=object)
+
+
+class PriorArtIndex:
+    """ نمایه تقریبی نزدیک‌ترین همسایه برای پایان‌نامه‌های پیشین. """
+
+    COLUMN = PRIOR_ART_COLUMN
+
+    def __init__(self, dim=128, n_features=2 ** 18, fit_sample=50000, chunk_size=20000, seed=0):
+        self.hasher = HashingVectorizer(analyzer='word', ngram_range=(1, 2), n_features=n_features,
+                                        alternate_sign=False, norm=None)
+        self.tfidf = TfidfTransformer(sublinear_tf=True)
+        self.svd = TruncatedSVD(dim, random_state=seed)
+        self.fit_sample = fit_sample
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.centroids = None
+        # بردارها به ترتیب خوشه ذخیره می‌شوند؛ offsets[c]:offsets[c+1] محدوده خوشه c است
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.positions = np.empty(0, dtype=np.int64)  # شماره پایان‌نامه برای هر بردار
+        self.thesis_ids = np.empty(0, dtype=object)
+        self.titles = []
+
+    def __len__(self):
+        return len(self.titles)
+
+    def _features(self, titles, abstracts):
+        return self.hasher.transform((_clean(titles) + "\n" + _clean(abstracts)).tolist())
+
+    def embed(self, titles, abstracts):
+        """ بردار نرمال‌شده LSA برای هر ردیف (به صورت تکه‌تکه برای محدود کردن حافظه). """
+        titles, abstracts = _clean(titles), _clean(abstracts)
+        out = np.empty((len(titles), self.svd.n_components), dtype=np.float32)
+        for start in range(0, len(titles), self.chunk_size):
+            stop = start + self.chunk_size
+            X = self.tfidf.transform(self._features(titles[start:stop], abstracts[start:stop]))
+            out[start:stop] = self.svd.transform(X)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+    def build(self, titles, abstracts, ids=None):
+        """
+        مدل متنی و خوشه‌ها را روی (نمونه‌ای از) داده آموزش داده و همه ردیف‌ها را نمایه می‌کند.
+        ids (اختیاری): شناسه پایدار هر پایان‌نامه برای exclude_ids در search.
+        """
+        titles, abstracts = _clean(titles), _clean(abstracts)
+        rng = np.random.default_rng(self.seed)
+        sample = rng.permutation(len(titles))[:self.fit_sample]
+        X = self.tfidf.fit_transform(self._features(titles[sample], abstracts[sample]))
+        self.svd.n_components = min(self.svd.n_components, X.shape[0] - 1, X.shape[1] - 1)
+        self.svd.fit(X)
+
+        vectors = self.embed(titles, abstracts)
+        n_lists = int(np.clip(np.sqrt(len(titles)), 1, 4096))
+        kmeans = MiniBatchKMeans(n_lists, random_state=self.seed, n_init=1, batch_size=4096)
+        kmeans.fit(vectors[sample])
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        self.centroids = centroids / np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        self.vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self.positions = np.empty(0, dtype=np.int64)
+        self.thesis_ids = np.empty(0, dtype=object)
+        self.titles = []
+        self._append(vectors, titles, ids)
+        return self
+
+    def add(self, titles, abstracts, ids=None):
+        """ پایان‌نامه‌های جدید را بدون آموزش مجدد به نمایه اضافه می‌کند. """
+        if self.centroids is None:
+            return self.build(titles, abstracts, ids)
+        titles = _clean(titles)
+        self._append(self.embed(titles, abstracts), titles, ids)
+        return self
+
+    def _append(self, vectors, titles, ids=None):
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+        old_assignments = np.repeat(np.arange(len(self.centroids)), np.diff(self.offsets)) \
+            if len(self.vectors) else np.empty(0, dtype=np.int64)
+        all_assignments = np.concatenate([old_assignments, assignments])
+        order = np.argsort(all_assignments, kind='stable')
+
+        new_positions = np.arange(len(self.titles), len(self.titles) + len(titles))
+        self.vectors = np.concatenate([self.vectors, vectors])[order]
+        self.positions = np.concatenate([self.positions, new_positions])[order]
+        self.thesis_ids = np.concatenate([self.thesis_ids, _thesis_ids(ids, len(titles))])[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(all_assignments, minlength=len(self.centroids)))])
+        self.titles.extend(titles.tolist())
+
+    def search(self, titles, abstracts, k=3, nprobe=8, exclude_ids=None):
+        """
+        جستجوی دسته‌ای k پایان‌نامه مشابه. خروجی: (شماره‌ها، امتیاز شباهت کسینوسی)
+        هر دو با ابعاد (تعداد ردیف، k)؛ خانه‌های خالی با ‎-1 و NaN پر می‌شوند.
+        exclude_ids (اختیاری): شناسه پایدار هر ردیف پرس‌وجو؛ پایان‌نامه نمایه‌شده با همان شناسه
+        (خود ردیف) از نتایج حذف می‌شود. پیش‌فرض: هیچ نتیجه‌ای حذف نمی‌شود.
+        """
+        queries = self.embed(titles, abstracts)
+        query_ids = _thesis_ids(exclude_ids, len(queries)) if exclude_ids is not None else None
+        n_lists = len(self.centroids)
+        nprobe = min(nprobe, n_lists)
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), np.nan, dtype=np.float32)
+        for r, query in enumerate(queries):
+            spans = [(self.offsets[c], self.offsets[c + 1]) for c in probes[r]]
+            sims = np.concatenate([self.vectors[a:b] @ query for a, b in spans])
+            cand = np.concatenate([np.arange(a, b) for a, b in spans])
+            if query_ids is not None and query_ids[r]:
+                sims[self.thesis_ids[cand] == query_ids[r]] = -np.inf
+            top = min(k, len(sims))
+            if top == 0:
+                continue
+            best = np.argpartition(-sims, top - 1)[:top]
+            best = best[np.argsort(-sims[best])]
+            best = best[np.isfinite(sims[best])]
+            ids[r, :len(best)] = self.positions[cand[best]]
+            scores[r, :len(best)] = sims[best]
+        return ids, scores
+
+    def describe(self, ids, scores):
+        """ برای هر ردیف متنی مانند «عنوان (شباهت ۰٫۸۷)؛ ...» برمی‌گرداند. """
+        return [
+            "؛ ".join(f"{self.titles[i]} (شباهت {s:.2f})" for i, s in zip(row_ids, row_scores) if i >= 0)
+            for row_ids, row_scores in zip(ids, scores)
+        ]
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=DEFAULT_INDEX_PATH):
+        return joblib.load(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="نمایه شباهت پایان‌نامه‌های پیشین")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in [("build", "ساخت نمایه از ابتدا"), ("add", "افزودن پایان‌نامه‌های جدید"),
+                            ("query", "یافتن پایان‌نامه‌های مشابه برای یک فایل")]:
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("input")
+        p.add_argument("--title-col", required=True)
+        p.add_argument("--abstract-col", required=True)
+        p.add_argument("--index", default=DEFAULT_INDEX_PATH)
+        p.add_argument("--id-col", help="ستون شناسه پایدار پایان‌نامه (برای حذف خود پایان‌نامه از نتایج)")
+    p.add_argument("--k", type=int, default=3)
+    p.add_argument("--out", required=True)
+
+    args = parser.parse_args(argv)
+    df = pd.read_excel(args.input)
+    titles, abstracts = df[args.title_col], df[args.abstract_col]
+    ids = df[args.id_col] if args.id_col else None
+
+    if args.command == "build":
+        index = PriorArtIndex().build(titles, abstracts, ids)
+        index.save(args.index)
+        print(f"{len(index)} پایان‌نامه نمایه شد.")
+    elif args.command == "add":
+        index = PriorArtIndex.load(args.index).add(titles, abstracts, ids)
+        index.save(args.index)
+        print(f"نمایه اکنون {len(index)} پایان‌نامه دارد.")
+    elif args.command == "query":
+        index = PriorArtIndex.load(args.index)
+        start = time.perf_counter()
+        ids, scores = index.search(titles, abstracts, k=args.k, exclude_ids=ids)
+        elapsed = time.perf_counter() - start
+        df[PRIOR_ART_COLUMN] = index.describe(ids[:, :1], scores[:, :1])
+        df["پایان‌نامه‌های مشابه"] = index.describe(ids, scores)
+        df.to_excel(args.out, index=False)
+        print(f"{len(df)} ردیف در {elapsed * 1000:.1f} میلی‌ثانیه جستجو شد.")
+
+
+if __name__ == "__main__":
+    main()
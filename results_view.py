@@ -0,0 +1,76 @@
+"""
+نمایش سبک نتایج در اپلیکیشن‌های Streamlit.
+
+به جای ارسال کل جدول نتایج به مرورگر در هر اجرای مجدد، در حین پردازش فقط چند نتیجه آخر
+نمایش داده می‌شود و پس از پایان، جستجو، مرتب‌سازی و صفحه‌بندی در سمت سرور انجام شده و
+فقط یک صفحه از جدول ارسال می‌شود؛ بنابراین هزینه هر به‌روزرسانی به تعداد ردیف‌های
+پردازش‌شده بستگی ندارد.
+"""
+
+import math
+
+import pandas as pd
+import streamlit as st
+
+from text_normalization import to_numeric
+
+PAGE_SIZES = [25, 50, 100, 200]
+LATEST_ROWS = 10
+
+
+def show_latest_results(results, container=st, n=LATEST_ROWS):
+    """ n نتیجه آخر را نمایش می‌دهد (هزینه ثابت در هر به‌روزرسانی). """
+    if results:
+        start = max(0, len(results) - n)
+        tail = pd.DataFrame(results[start:], index=range(start + 1, len(results) + 1))
+        container.dataframe(tail)
+
+
+def _sort_key(series):
+    # ستون‌های امتیاز ترکیبی از عدد و «N/A» هستند؛ در صورت وجود عدد، به صورت عددی مرتب می‌شوند
+    numeric = to_numeric(series)
+    return numeric if numeric.notna().any() else series.astype(str)
+
+
+def _view_index(df, key, filter_col, query, sort_col, ascending):
+    """ شماره ردیف‌های نمای جستجو/مرتب‌شده؛ نتیجه تا تغییر جدول یا تنظیمات در جلسه نگهداری می‌شود. """
+    cache = st.session_state.setdefault(f"{key}_view_cache", {})
+    cache_key = (id(df), len(df), filter_col, query, sort_col, ascending)
+    if cache_key not in cache:
+        cache.clear()
+        view = df
+        if query:
+            if filter_col is None:
+                haystack = df.astype(str).agg(' '.join, axis=1)
+            else:
+                haystack = df[filter_col].astype(str)
+            view = view[haystack.str.contains(query, regex=False, na=False)]
+        if sort_col is not None:
+            view = view.sort_values(sort_col, ascending=ascending, kind='stable', key=_sort_key)
+        cache[cache_key] = view.index.to_numpy()
+    return cache[cache_key]
+
+
+def show_results_page(df, key="results"):
+    """ جدول نتایج با جستجو، مرتب‌سازی و صفحه‌بندی سمت سرور. """
+    columns = df.columns.tolist()
+    filter_box, query_box, sort_box, order_box = st.columns([2, 3, 2, 1])
+    filter_col = filter_box.selectbox("جستجو در ستون:", [None] + columns, key=f"{key}_filter_col",
+                                      format_func=lambda c: "همه ستون‌ها" if c is None else str(c))
+    query = query_box.text_input("عبارت جستجو:", key=f"{key}_query")
+    sort_col = sort_box.selectbox("مرتب‌سازی بر اساس:", [None] + columns, key=f"{key}_sort_col",
+                                  format_func=lambda c: "ترتیب فایل" if c is None else str(c))
+    ascending = order_box.toggle("صعودی", value=True, key=f"{key}_ascending")
+
+    index = _view_index(df, key, filter_col, query, sort_col, ascending)
+
+    size_box, page_box, info_box = st.columns([1, 1, 4])
+    page_size = size_box.selectbox("ردیف در صفحه:", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    n_pages = max(1, math.ceil(len(index) / page_size))
+    # بدون key تا با تغییر تعداد صفحات (مثلاً پس از جستجو) به صفحه اول برگردد
+    page = page_box.number_input("صفحه:", min_value=1, max_value=n_pages, value=1)
+    start = (page - 1) * page_size
+    page_index = index[start:start + page_size]
+    info_box.caption(f"نمایش ردیف‌های {start + 1 if len(page_index) else 0} تا {start + len(page_index)} "
+                     f"از {len(index)} ردیف (کل نتایج: {len(df)})")
+    st.dataframe(df.loc[page_index])
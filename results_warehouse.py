@@ -0,0 +1,222 @@
+"""
+انبار ستونی نتایج تاریخی (Parquet پارتیشن‌بندی‌شده + DuckDB).
+
+هر کار تکمیل‌شده به صورت جدول «بلند» (یک سطر برای هر پایان‌نامه و هر شاخص) در پوشه
+scores/rubric=<کلید>/year=<سال>/ ذخیره می‌شود و نسخه روبریک، نام مدل و زمان امتیازدهی را
+همراه دارد. برای هر کار یک جدول تجمیعی (rollup) کوچک از تعداد، مجموع و مجموع مربعات امتیازها
+به ازای (روبریک، نسخه، مدل، سال، گروه، شاخص) در پوشه rollup/ نوشته می‌شود و خواننده‌ها این
+فایل‌ها را با هم جمع می‌زنند؛ بنابراین کارهایی که همزمان ثبت می‌شوند فایل مشترکی را بازنویسی
+نمی‌کنند و گزارش‌های رایج (مثلاً میانگین امتیاز تجاری‌سازی هر دانشکده در سه سال) بدون خواندن
+داده خام پاسخ داده می‌شوند.
+پرس‌وجوهای دلخواه با DuckDB مستقیماً روی فایل‌های Parquet اجرا می‌شوند.
+
+نمونه اجرا:
+    python results_warehouse.py ingest results_1401.xlsx --rubric innovation --title-col عنوان --group-col دانشکده --scored-at 2022-09-01
+    python results_warehouse.py query "SELECT group_name, year, avg(score) FROM scores WHERE criterion = 'تجاری‌سازی' GROUP BY ALL"
+"""
+
+import argparse
+import glob
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+import duckdb
+import pandas as pd
+
+from gemini_client import MODEL_NAME
+from rubrics import RUBRICS, get_rubrics, result_column_candidates, rubric_version
+from text_normalization import to_numeric
+
+DEFAULT_WAREHOUSE_DIR = "results_warehouse"
+ROLLUP_KEYS = ["rubric", "rubric_version", "model", "year", "group_name", "criterion"]
+
+
+def _scores_dir(warehouse_dir):
+    return os.path.join(warehouse_dir, "scores")
+
+
+def _rollup_dir(warehouse_dir):
+    return os.path.join(warehouse_dir, "rollup")
+
+
+def _rollup_file(warehouse_dir, job_id):
+    return os.path.join(_rollup_dir(warehouse_dir), f"job-{job_id}.parquet")
+
+
+def _write_atomic(df, path):
+    # نوشتن در فایل موقت (با پیشوند نقطه تا در خواندن پوشه نادیده گرفته شود) و جایگزینی اتمیک
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _utc(value):
+    # زمان بدون منطقه زمانی (مثلاً «2023-06-30») به عنوان UTC در نظر گرفته می‌شود
+    value = pd.Timestamp(value)
+    return (value.tz_localize(timezone.utc) if value.tzinfo is None else value.tz_convert(timezone.utc)).to_pydatetime()
+
+
+def _find_column(columns, rubric_key, field):
+    return next((name for name in result_column_candidates(rubric_key, field) if name in columns), None)
+
+
+def to_long(final_df, rubric_key, model_name, title_col=None, group_col=None, job_id=None, scored_at=None):
+    """ جدول نتایج یک کار را برای یک روبریک به قالب بلند انبار تبدیل می‌کند. """
+    rubric = RUBRICS[rubric_key]
+    scored_at = scored_at or datetime.now(timezone.utc)
+    n = len(final_df)
+    base = pd.DataFrame({
+        "job_id": job_id or uuid.uuid4().hex[:12],
+        "scored_at": pd.Series([scored_at] * n, dtype="datetime64[us, UTC]"),
+        "model": model_name,
+        "rubric_version": rubric_version(rubric_key),
+        "row_id": range(n),
+        "title": final_df[title_col].astype(str).to_numpy() if title_col else None,
+        "group_name": final_df[group_col].fillna("نامشخص").astype(str).to_numpy() if group_col else "همه",
+    })
+    category_field = getattr(rubric, "CATEGORY_FIELD", None)
+    category_col = _find_column(final_df.columns, rubric_key, category_field) if category_field else None
+    base["category"] = final_df[category_col].astype(str).to_numpy() if category_col else None
+
+    fields = list(rubric.SCORE_FIELDS) + ([rubric.TOTAL_FIELD] if getattr(rubric, "TOTAL_FIELD", None) else [])
+    parts = []
+    for field in fields:
+        column = _find_column(final_df.columns, rubric_key, field)
+        if column is None:
+            continue
+        part = base.copy()
+        part["criterion"] = field
+        part["score"] = to_numeric(final_df[column]).to_numpy(dtype=float)
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame()
+    long_df = pd.concat(parts, ignore_index=True)
+    long_df["year"] = long_df["scored_at"].dt.year
+    return long_df
+
+
+def _rollup(long_df):
+    scored = long_df.dropna(subset=["score"]).assign(score_sq=lambda d: d["score"] ** 2)
+    return scored.groupby(ROLLUP_KEYS, as_index=False).agg(
+        n=("score", "size"), score_sum=("score", "sum"), score_sq_sum=("score_sq", "sum"))
+
+
+def append_job(final_df, rubric_keys, model_name, title_col=None, group_col=None,
+               warehouse_dir=DEFAULT_WAREHOUSE_DIR, job_id=None, scored_at=None):
+    """
+    نتایج یک کار تکمیل‌شده را (برای هر روبریک انتخاب‌شده) به انبار اضافه و جدول تجمیعی همان کار را
+    می‌نویسد. scored_at (اختیاری، مثلاً برای فایل‌های نتایج قدیمی) زمان امتیازدهی و در نتیجه پارتیشن
+    سال را تعیین می‌کند؛ پیش‌فرض زمان فعلی است. خروجی: تعداد سطرهای نوشته‌شده.
+    """
+    job_id = job_id or uuid.uuid4().hex[:12]
+    scored_at = _utc(scored_at) if scored_at is not None else datetime.now(timezone.utc)
+    written = 0
+    rollups = []
+    for rubric_key, _ in get_rubrics(list(rubric_keys)):
+        long_df = to_long(final_df, rubric_key, model_name, title_col, group_col, job_id, scored_at)
+        if long_df.empty:
+            continue
+        partition = os.path.join(_scores_dir(warehouse_dir), f"rubric={rubric_key}", f"year={scored_at.year}")
+        os.makedirs(partition, exist_ok=True)
+        long_df.drop(columns=["year"]).to_parquet(os.path.join(partition, f"job-{job_id}.parquet"), index=False)
+        rollups.append(_rollup(long_df.assign(rubric=rubric_key)))
+        written += len(long_df)
+
+    if rollups:
+        # هر کار فایل تجمیعی خودش را دارد؛ خواندن-ادغام-بازنویسی فایل مشترک (و از دست رفتن کار همزمان) لازم نیست
+        os.makedirs(_rollup_dir(warehouse_dir), exist_ok=True)
+        _write_atomic(pd.concat(rollups, ignore_index=True), _rollup_file(warehouse_dir, job_id))
+    return written
+
+
+def rebuild_rollup(warehouse_dir=DEFAULT_WAREHOUSE_DIR):
+    """
+    جدول تجمیعی هر کار را از روی داده خام دوباره می‌سازد (مثلاً پس از حذف دستی یک کار) و فایل‌های
+    تجمیعی کارهایی را که دیگر داده خام ندارند حذف می‌کند. خروجی: جدول تجمیعی کل انبار.
+    """
+    started = time.time()
+    con = connect(warehouse_dir)
+    per_job = con.execute(f"""
+        SELECT job_id, {', '.join(ROLLUP_KEYS)}, count(*) AS n, sum(score) AS score_sum, sum(score * score) AS score_sq_sum
+        FROM scores WHERE score IS NOT NULL GROUP BY ALL
+    """).df()
+    os.makedirs(_rollup_dir(warehouse_dir), exist_ok=True)
+    jobs = set()
+    for job_id, part in per_job.groupby("job_id"):
+        jobs.add(_rollup_file(warehouse_dir, job_id))
+        _write_atomic(part.drop(columns=["job_id"]), _rollup_file(warehouse_dir, job_id))
+    for path in glob.glob(os.path.join(_rollup_dir(warehouse_dir), "*.parquet")):
+        # فایل کارهایی که پس از شروع بازسازی ثبت شده‌اند دست‌نخورده می‌ماند
+        if path not in jobs and os.path.getmtime(path) < started:
+            os.remove(path)
+    return per_job.groupby(ROLLUP_KEYS, as_index=False)[["n", "score_sum", "score_sq_sum"]].sum()
+
+
+def connect(warehouse_dir=DEFAULT_WAREHOUSE_DIR):
+    """ اتصال DuckDB با دو نمای scores (داده خام) و rollup (مجموع جدول‌های تجمیعی همه کارها). """
+    con = duckdb.connect()
+    pattern = os.path.join(_scores_dir(warehouse_dir), "**", "*.parquet")
+    con.execute(f"CREATE VIEW scores AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)")
+    rollup_pattern = os.path.join(_rollup_dir(warehouse_dir), "*.parquet")
+    if glob.glob(rollup_pattern):
+        con.execute(f"""
+            CREATE VIEW rollup AS
+            SELECT {', '.join(ROLLUP_KEYS)}, sum(n)::BIGINT AS n, sum(score_sum) AS score_sum, sum(score_sq_sum) AS score_sq_sum
+            FROM read_parquet('{rollup_pattern}') GROUP BY ALL
+        """)
+    return con
+
+
+def query(sql, warehouse_dir=DEFAULT_WAREHOUSE_DIR):
+    return connect(warehouse_dir).execute(sql).df()
+
+
+def rollup_summary(rubric_key, criterion, by, warehouse_dir=DEFAULT_WAREHOUSE_DIR):
+    """
+    میانگین، انحراف معیار و تعداد امتیازهای یک شاخص به تفکیک ستون‌های by (مثلاً group_name و year)
+    فقط از روی جدول تجمیعی.
+    """
+    rollup = pd.read_parquet(_rollup_dir(warehouse_dir),
+                             filters=[("rubric", "==", rubric_key), ("criterion", "==", criterion)])
+    grouped = rollup.groupby(list(by), as_index=False)[["n", "score_sum", "score_sq_sum"]].sum()
+    grouped["mean"] = grouped["score_sum"] / grouped["n"]
+    grouped["std"] = ((grouped["score_sq_sum"] / grouped["n"]) - grouped["mean"] ** 2).clip(lower=0) ** 0.5
+    return grouped.drop(columns=["score_sum", "score_sq_sum"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="انبار ستونی نتایج ارزیابی پایان‌نامه‌ها")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="افزودن یک فایل نتایج (اکسل) به انبار")
+    p.add_argument("input")
+    p.add_argument("--rubric", nargs="+", choices=sorted(RUBRICS), default=["innovation"])
+    p.add_argument("--model", default=MODEL_NAME)
+    p.add_argument("--title-col")
+    p.add_argument("--group-col")
+    p.add_argument("--scored-at", help="زمان امتیازدهی فایل‌های قدیمی (مثلاً 2022-09-01)؛ پارتیشن سال از آن گرفته می‌شود")
+
+    p = sub.add_parser("query", help="اجرای پرس‌وجوی SQL روی نماهای scores و rollup")
+    p.add_argument("sql")
+
+    sub.add_parser("rebuild-rollup", help="ساخت مجدد جدول تجمیعی از داده خام")
+
+    for p in sub.choices.values():
+        p.add_argument("--warehouse", default=DEFAULT_WAREHOUSE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        n = append_job(pd.read_excel(args.input), args.rubric, args.model, args.title_col, args.group_col,
+                       args.warehouse, scored_at=args.scored_at)
+        print(f"{n} سطر به انبار اضافه شد.")
+    elif args.command == "query":
+        with pd.option_context("display.max_rows", 200, "display.width", 200):
+            print(query(args.sql, args.warehouse))
+    elif args.command == "rebuild-rollup":
+        print(f"{len(rebuild_rollup(args.warehouse))} سطر تجمیعی ساخته شد.")
+
+
+if __name__ == "__main__":
+    main()
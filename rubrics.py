@@ -0,0 +1,176 @@
+"""
+رجیستری روبریک‌های ارزیابی و ترکیب چند روبریک در یک درخواست.
+
+وقتی چند روبریک برای یک کار انتخاب می‌شود، عنوان و چکیده فقط یک بار ارسال می‌شوند:
+معیارهای همه روبریک‌ها در یک دستور (prompt) ترکیبی قرار می‌گیرند، پاسخ مدل بر اساس
+سطرهای عنوان بخش (مثلاً «### innovation») تفکیک می‌شود و هر بخش با parse_response
+همان روبریک تجزیه شده و در ستون‌های جداگانه (با پیشوند نام روبریک) قرار می‌گیرد.
+"""
+
+import hashlib
+import re
+
+import innovation_rubric
+import pharmacy_rubric
+
+RUBRICS = {
+    "innovation": innovation_rubric,
+    "pharmacy": pharmacy_rubric,
+}
+
+# سطر عنوان بخش: «### innovation»، «## Pharmacy»، «**INNOVATION**» یا همان عنوان معیارها در دستور
+# («### innovation — نوآوری ۵ شاخصه»)؛ بزرگی و کوچکی حروف اهمیتی ندارد
+_SECTION_RE = re.compile(r'^\s*(?:\**\s*#+\s*\**|\*\*)\s*([a-z_]+)\b', re.IGNORECASE)
+
+# ابتدای بخش مشخصات پایان‌نامه در همه دستورها؛ زمینه پیشینه درست قبل از آن قرار می‌گیرد
+_THESIS_BLOCK = "        ---\n        **عنوان پایان‌نامه:**"
+
+
+def get_rubrics(keys):
+    """ لیست (کلید، ماژول روبریک) را به ترتیب انتخاب کاربر برمی‌گرداند. """
+    if isinstance(keys, str):
+        keys = [keys]
+    if not keys:
+        raise ValueError("حداقل یک روبریک باید انتخاب شود.")
+    unknown = [k for k in keys if k not in RUBRICS]
+    if unknown:
+        raise ValueError(f"روبریک ناشناخته: {', '.join(unknown)}")
+    return [(k, RUBRICS[k]) for k in keys]
+
+
+def _fields(rubric):
+    # کلیدهای خروجی parse_response با مقادیر پیش‌فرض آن
+    return list(rubric.parse_response('').keys())
+
+
+def _prefixed(rubric, column):
+    return f"{rubric.LABEL} | {column}"
+
+
+def _with_prior_art(prompt, prior_art):
+    """ فهرست پایان‌نامه‌های مشابه پیشین را به عنوان زمینه سنجش نوآوری به دستور اضافه می‌کند. """
+    context = (
+        "        **پایان‌نامه‌های مشابه پیشین در همین دانشگاه (برای سنجش نوآوری نسبت به کارهای قبلی):**\n"
+        f"        {prior_art}\n"
+        "        اگر پایان‌نامه زیر تقریباً تکرار یکی از این کارهاست، در امتیاز نوآوری لحاظ کنید.\n\n"
+    )
+    head, sep, tail = prompt.rpartition(_THESIS_BLOCK)
+    return head + context + sep + tail
+
+
+def create_prompt(title, abstract, keys, prior_art=None):
+    """
+    برای یک روبریک همان دستور اصلی و برای چند روبریک یک دستور ترکیبی می‌سازد.
+    prior_art (اختیاری) متن پایان‌نامه‌های مشابه پیشین است که پیش از مشخصات پایان‌نامه درج می‌شود.
+    """
+    selected = get_rubrics(keys)
+    if len(selected) == 1:
+        prompt = selected[0][1].create_prompt(title, abstract)
+        return _with_prior_art(prompt, prior_art) if prior_art else prompt
+
+    sections = "\n\n".join(
+        f"        ### {key} — {rubric.LABEL}\n        {rubric.CRITERIA}" for key, rubric in selected
+    )
+    formats = "\n\n".join(
+        f"        ### {key}\n        {rubric.OUTPUT_FORMAT}" for key, rubric in selected
+    )
+    prompt = f"""
+        شما یک متخصص ارزیابی نوآوری، تجاری‌سازی و انتقال فناوری هستید.
+        پایان‌نامه زیر را باید با {len(selected)} روبریک مستقل ارزیابی کنید. هر بخش را جداگانه و فقط بر اساس معیارهای همان بخش امتیاز دهید.
+
+{sections}
+
+        خروجی را **دقیقا** با فرمت زیر و فقط به زبان فارسی ارائه دهید. هر بخش باید با سطر عنوان خودش (مانند «### {selected[0][0]}») شروع شود:
+
+{formats}
+
+        ---
+        **عنوان پایان‌نامه:** {title}
+
+        **چکیده پایان‌نامه:** {abstract}
+        ---
+    """
+    return _with_prior_art(prompt, prior_art) if prior_art else prompt
+
+
+def split_sections(text, keys):
+    """
+    پاسخ ترکیبی را بر اساس سطرهای عنوان بخش به متن جداگانه برای هر روبریک تفکیک می‌کند.
+    عنوان هر روبریک ثبت‌شده بخش قبلی را می‌بندد؛ سطرهای بخش روبریک‌های انتخاب‌نشده کنار گذاشته می‌شوند.
+    """
+    sections = {}
+    current = None
+    for line in text.strip().split('\n'):
+        match = _SECTION_RE.match(line)
+        key = match.group(1).lower() if match else None
+        if key in keys:
+            current = key
+            sections[current] = []
+        elif key in RUBRICS:
+            current = None
+        elif current is not None:
+            sections[current].append(line)
+    return {key: '\n'.join(lines) for key, lines in sections.items()}
+
+
+def parse_response(text, keys):
+    """
+    برای یک روبریک همان parse_response اصلی را اجرا می‌کند؛ برای چند روبریک، هر بخش پاسخ را
+    جداگانه تجزیه کرده و ستون‌ها را با پیشوند نام روبریک برمی‌گرداند. روبریکی که بخشش در پاسخ
+    نیست ناقص (N/A) ثبت می‌شود.
+    """
+    selected = get_rubrics(keys)
+    if len(selected) == 1:
+        return selected[0][1].parse_response(text)
+
+    sections = split_sections(text, [key for key, _ in selected])
+    data = {}
+    for key, rubric in selected:
+        parsed = rubric.parse_response(sections.get(key, ''))
+        if key not in sections:
+            parsed["تحلیل کلی"] = f"بخش «{key}» در پاسخ مدل یافت نشد."
+        data.update({_prefixed(rubric, field): value for field, value in parsed.items()})
+    return data
+
+
+def empty_result(keys, message):
+    """ نتیجه ردیفی که پاسخ مدل ندارد (رد شده یا خطا): ستون‌های خالی parse_response با پیام در «تحلیل کلی». """
+    data = {column: "N/A" for column in parse_response('', keys)}
+    for rubric_key, _ in get_rubrics(keys):
+        data[result_key(keys, rubric_key, "تحلیل کلی")] = message
+    return data
+
+
+def result_key(keys, rubric_key, field):
+    """ نام ستون یک فیلد روبریک در خروجی parse_response (با پیشوند در ارزیابی چندروبریکی). """
+    selected = get_rubrics(keys)
+    return field if len(selected) == 1 else _prefixed(RUBRICS[rubric_key], field)
+
+
+def result_column_candidates(rubric_key, field):
+    """
+    نام‌های ممکن ستون یک فیلد در جدول‌های نتایج: کلید خام parse_response، نام ستون فایل نهایی
+    (RESULT_COLUMNS) یا نسخه پیشونددار ارزیابی چندروبریکی.
+    """
+    rubric = RUBRICS[rubric_key]
+    names = [field, rubric.RESULT_COLUMNS.get(field, field)]
+    return names + [_prefixed(rubric, name) for name in names]
+
+
+def rubric_version(rubric_key):
+    """ شناسه کوتاه نسخه روبریک بر اساس متن معیارها و فرمت خروجی آن. """
+    rubric = RUBRICS[rubric_key]
+    return hashlib.sha1((rubric.CRITERIA + rubric.OUTPUT_FORMAT).encode()).hexdigest()[:8]
+
+
+def result_columns(keys):
+    """ نگاشت نام ستون‌های خروجی parse_response به نام ستون‌های فایل نهایی. """
+    selected = get_rubrics(keys)
+    if len(selected) == 1:
+        return selected[0][1].RESULT_COLUMNS
+
+    columns = {}
+    for _, rubric in selected:
+        for field in _fields(rubric):
+            columns[_prefixed(rubric, field)] = _prefixed(rubric, rubric.RESULT_COLUMNS.get(field, field))
+    return columns
@@ -0,0 +1,115 @@
+"""
+نمونه‌گیری تطبیقی (self-consistency) فقط برای ردیف‌های مبهم.
+
+هر ردیف ابتدا یک بار امتیازدهی می‌شود. فقط اگر نمره نهایی در فاصله margin از مرز یک سطح
+پتانسیل باشد (مثلاً ۴/۵ یا ۷/۸ با margin=1) یا پاسخ مدل ناقص تجزیه شده باشد، نمونه‌های
+بیشتری گرفته می‌شود؛ به محض اینکه اکثریت نمونه‌های کامل (دست‌کم دو نمونه) روی سطح پتانسیل
+توافق کنند یا سقف max_samples برسد، نمونه‌گیری متوقف و نتیجه با میانه امتیازها ترکیب می‌شود.
+"""
+
+import time
+from collections import Counter
+
+import numpy as np
+
+from rubrics import get_rubrics, parse_response, result_key
+
+SAMPLES_COLUMN = "تعداد نمونه"
+
+
+def _number(value):
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _checks(keys):
+    # برای هر روبریک: (کلید، ماژول، نام ستون‌های امتیاز، نام ستون نمره نهایی یا None)
+    checks = []
+    for rubric_key, rubric in get_rubrics(keys):
+        total_field = getattr(rubric, "TOTAL_FIELD", None)
+        fields = list(rubric.SCORE_FIELDS) + ([total_field] if total_field else [])
+        total = result_key(keys, rubric_key, total_field) if total_field else None
+        checks.append((rubric_key, rubric, [result_key(keys, rubric_key, f) for f in fields], total))
+    return checks
+
+
+def is_complete(parsed, keys):
+    """ همه امتیازهای عددی همه روبریک‌ها در پاسخ تجزیه‌شده وجود دارند. """
+    return all(_number(parsed.get(column)) is not None for _, _, columns, _ in _checks(keys) for column in columns)
+
+
+def near_boundary(total, thresholds, margin=1):
+    """ نمره نهایی در فاصله margin از حد پایین یکی از سطوح (به جز پایین‌ترین سطح) قرار دارد. """
+    return any(threshold - margin <= total < threshold + margin for threshold, _ in thresholds[:-1])
+
+
+def categories(parsed, keys):
+    """ سطح پتانسیل هر روبریک دارای آستانه (بر اساس نمره نهایی)؛ برای سنجش توافق نمونه‌ها. """
+    return tuple(
+        rubric.potential_category(_number(parsed.get(total))) if _number(parsed.get(total)) is not None else None
+        for _, rubric, _, total in _checks(keys) if total is not None and hasattr(rubric, "potential_category")
+    )
+
+
+def is_ambiguous(parsed, keys, margin=1):
+    """ ردیف به نمونه‌های بیشتر نیاز دارد: پاسخ ناقص است یا نمره نهایی نزدیک مرز یک سطح است. """
+    if not is_complete(parsed, keys):
+        return True
+    return any(
+        near_boundary(_number(parsed[total]), rubric.POTENTIAL_THRESHOLDS, margin)
+        for _, rubric, _, total in _checks(keys) if total is not None and hasattr(rubric, "POTENTIAL_THRESHOLDS")
+    )
+
+
+def combine(samples, keys):
+    """
+    نمونه‌ها را با میانه هر امتیاز ترکیب می‌کند؛ سطح پتانسیل از میانه نمره نهایی و سایر
+    ستون‌ها (مانند متن تحلیل) از نمونه‌ای گرفته می‌شوند که نمره نهایی‌اش به میانه نزدیک‌تر است.
+    """
+    complete = [s for s in samples if is_complete(s, keys)] or samples
+    checks = _checks(keys)
+    medians = {}
+    for _, _, columns, _ in checks:
+        for column in columns:
+            values = [v for v in (_number(s.get(column)) for s in complete) if v is not None]
+            if values:
+                median = float(np.median(values))
+                medians[column] = str(int(median)) if median.is_integer() else f"{median:.1f}"
+
+    totals = [total for _, _, _, total in checks if total in medians]
+
+    def distance(sample):
+        return sum(abs((_number(sample.get(t)) or 0) - _number(medians[t])) for t in totals)
+
+    combined = {**min(complete, key=distance), **medians}
+    for rubric_key, rubric, _, total in checks:
+        if total in medians and hasattr(rubric, "potential_category"):
+            combined[result_key(keys, rubric_key, rubric.CATEGORY_FIELD)] = rubric.potential_category(_number(medians[total]))
+    return combined
+
+
+def score_adaptive(generate, prompt, keys, margin=1, max_samples=5, delay=1.0):
+    """
+    generate(prompt) متن پاسخ مدل را برمی‌گرداند. خروجی: (نتیجه تجزیه‌شده، تعداد فراخوانی‌ها).
+    خطای فراخوانی اول مانند حالت عادی به فراخوان برگردانده می‌شود؛ خطای نمونه‌های بعدی فقط نمونه‌گیری را متوقف می‌کند.
+    """
+    samples = [parse_response(generate(prompt), keys)]
+    calls = 1
+    if not is_ambiguous(samples[0], keys, margin):
+        return samples[0], calls
+
+    while calls < max_samples:
+        time.sleep(delay)
+        try:
+            samples.append(parse_response(generate(prompt), keys))
+        except Exception:
+            break
+        calls += 1
+        votes = Counter(categories(s, keys) for s in samples if is_complete(s, keys))
+        # توقف زودهنگام: یک سطح (برای همه روبریک‌ها) دست‌کم دو رأی و اکثریت مطلق نمونه‌های کامل را دارد
+        top = votes.most_common(1)[0][1] if votes else 0
+        if top >= 2 and top * 2 > sum(votes.values()):
+            break
+    return combine(samples, keys), calls
@@ -0,0 +1,329 @@
+"""
+اجرای توزیع‌شده (sharded) امتیازدهی برای آرشیوهای بزرگ پایان‌نامه.
+
+هماهنگ‌کننده (coordinator) ردیف‌های فایل اکسل را به صورت آیتم‌های کاری در یک صف پایدار
+SQLite می‌نویسد. چند پردازش کارگر (worker) که می‌توانند روی چند ماشین با فایل‌سیستم
+مشترک اجرا شوند، آیتم‌ها را با اجاره (lease) برمی‌دارند، با همان create_prompt/parse_response
+اپلیکیشن‌ها امتیاز می‌دهند و نتیجه را در صف ثبت می‌کنند. اجاره‌های منقضی‌شده (مثلاً کارگری که
+از کار افتاده) دوباره قابل برداشت هستند و ادغام نهایی ترتیب ردیف‌های ورودی را حفظ می‌کند.
+
+نمونه اجرا:
+    python sharded_scoring.py enqueue theses.xlsx --db queue.sqlite --title-col عنوان --abstract-col چکیده
+    GOOGLE_API_KEY=... python sharded_scoring.py work --db queue.sqlite --processes 4
+    python sharded_scoring.py status --db queue.sqlite
+    python sharded_scoring.py merge --db queue.sqlite --out results.xlsx
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from time import sleep
+
+import pandas as pd
+
+from gemini_client import MODEL_NAME, make_model
+from rubrics import RUBRICS, create_prompt, empty_result, get_rubrics, parse_response, result_columns
+from text_normalization import STATUS_EMPTY, TEXT_STATUS_COLUMN, prepare_texts, summary_message
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    idx INTEGER PRIMARY KEY,
+    title TEXT,
+    abstract TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status, idx);
+"""
+
+
+def connect(db_path):
+    """
+    اتصال به صف. از ژورنال پیش‌فرض (و نه WAL) استفاده می‌شود تا روی فایل‌سیستم اشتراکی هم کار کند؛
+    تراکنش‌ها به صورت دستی با BEGIN IMMEDIATE باز می‌شوند.
+    """
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _transaction(conn, fn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        out = fn()
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return out
+
+
+def get_meta(conn):
+    return {row["key"]: row["value"] for row in conn.execute("SELECT key, value FROM meta")}
+
+
+def enqueue(db_path, df, title_col, abstract_col, rubric_keys=("innovation",), source=None):
+    """
+    ردیف‌های df را (با متن نرمال‌شده) به ترتیب ورودی به عنوان آیتم‌های کاری در صف قرار می‌دهد.
+    ردیف‌های بدون عنوان یا چکیده از ابتدا «done» ثبت می‌شوند تا هیچ کارگری برایشان API فراخوانی نکند.
+    """
+    rubric_keys = [key for key, _ in get_rubrics(list(rubric_keys))]
+    conn = connect(db_path)
+    texts, summary = prepare_texts(df, title_col, abstract_col)
+    skipped = json.dumps(empty_result(rubric_keys, "عنوان یا چکیده موجود نیست."), ensure_ascii=False)
+    items = [
+        (i, title, abstract, "done" if status == STATUS_EMPTY else "pending", skipped if status == STATUS_EMPTY else None)
+        for i, (title, abstract, status) in enumerate(texts.itertuples(index=False))
+    ]
+
+    def write():
+        if conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]:
+            raise ValueError("این صف قبلاً مقداردهی شده است؛ برای کار جدید یک فایل صف جدید بسازید.")
+        conn.executemany("INSERT INTO items (idx, title, abstract, status, result) VALUES (?, ?, ?, ?, ?)", items)
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+            ("rubrics", ",".join(rubric_keys)), ("source", source or ""), ("total_rows", str(len(items))),
+            ("title_col", str(title_col)), ("abstract_col", str(abstract_col)),
+            ("text_summary", json.dumps(summary, ensure_ascii=False)),
+        ])
+
+    _transaction(conn, write)
+    conn.close()
+    return len(items)
+
+
+def claim(conn, worker_id, batch_size=1, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+    """
+    تعدادی آیتم آزاد یا با اجاره منقضی‌شده را برای این کارگر اجاره می‌کند.
+    آیتمی که اجاره‌اش پس از max_attempts تلاش منقضی شده (کارگرش را از کار انداخته یا متوقف کرده)
+    دوباره اجاره داده نمی‌شود و ناموفق ثبت می‌شود تا صف تمام شود. خروجی لیستی از (idx, title, abstract) است.
+    """
+    def take():
+        now = time.time()
+        stuck = conn.execute(
+            "SELECT idx FROM items WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, max_attempts),
+        ).fetchall()
+        if stuck:
+            rubric_keys = get_meta(conn)["rubrics"].split(",")
+            error = json.dumps(empty_result(rubric_keys, f"خطا: اجاره پس از {max_attempts} تلاش منقضی شد"), ensure_ascii=False)
+            conn.executemany(
+                "UPDATE items SET status = 'failed', result = ?, lease_owner = NULL, lease_expires = NULL, finished_at = ? "
+                "WHERE idx = ?",
+                [(error, now, row["idx"]) for row in stuck],
+            )
+        rows = conn.execute(
+            "SELECT idx, title, abstract FROM items "
+            "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+            "ORDER BY idx LIMIT ?",
+            (now, batch_size),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE items SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+            "WHERE idx = ?",
+            [(worker_id, now + lease_seconds, row["idx"]) for row in rows],
+        )
+        return [(row["idx"], row["title"], row["abstract"]) for row in rows]
+
+    return _transaction(conn, take)
+
+
+def complete(conn, idx, worker_id, result):
+    """ نتیجه را ثبت می‌کند؛ اگر اجاره در این فاصله به کارگر دیگری رسیده باشد نتیجه نادیده گرفته می‌شود. """
+    def write():
+        cur = conn.execute(
+            "UPDATE items SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL, finished_at = ? "
+            "WHERE idx = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), idx, worker_id),
+        )
+        return cur.rowcount == 1
+
+    return _transaction(conn, write)
+
+
+def fail(conn, idx, worker_id, error, max_attempts=MAX_ATTEMPTS):
+    """ آیتم را برای تلاش مجدد آزاد می‌کند یا پس از max_attempts تلاش آن را ناموفق ثبت می‌کند. """
+    def write():
+        attempts = conn.execute(
+            "SELECT attempts FROM items WHERE idx = ? AND status = 'leased' AND lease_owner = ?",
+            (idx, worker_id),
+        ).fetchone()
+        if attempts is None:
+            return
+        if attempts["attempts"] >= max_attempts:
+            rubric_keys = get_meta(conn)["rubrics"].split(",")
+            conn.execute(
+                "UPDATE items SET status = 'failed', result = ?, lease_owner = NULL, lease_expires = NULL, finished_at = ? "
+                "WHERE idx = ?",
+                (json.dumps(empty_result(rubric_keys, f"خطا: {error}"), ensure_ascii=False), time.time(), idx),
+            )
+        else:
+            conn.execute(
+                "UPDATE items SET status = 'pending', lease_owner = NULL, lease_expires = NULL WHERE idx = ?",
+                (idx,),
+            )
+
+    _transaction(conn, write)
+
+
+def queue_status(conn):
+    counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+    for row in conn.execute("SELECT status, COUNT(*) AS n FROM items GROUP BY status"):
+        counts[row["status"]] = row["n"]
+    return counts
+
+
+def run_worker(db_path, model=None, worker_id=None, batch_size=1, lease_seconds=LEASE_SECONDS,
+               delay=1.0, poll_interval=5.0):
+    """
+    حلقه اصلی کارگر: تا زمانی که آیتم آزاد یا اجاره‌ای باقی مانده باشد کار می‌کند.
+    خروجی تعداد آیتم‌هایی است که این کارگر تکمیل کرده است.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect(db_path)
+    rubric_keys = get_meta(conn)["rubrics"].split(",")
+    model = model or make_model()
+    done = 0
+    while True:
+        batch = claim(conn, worker_id, batch_size, lease_seconds)
+        if not batch:
+            counts = queue_status(conn)
+            if counts["pending"] == 0 and counts["leased"] == 0:
+                break
+            # آیتم‌هایی در اجاره کارگران دیگر هستند؛ منتظر می‌مانیم تا تمام یا منقضی شوند
+            sleep(poll_interval)
+            continue
+        for idx, title, abstract in batch:
+            prompt = create_prompt(title, abstract, rubric_keys)
+            try:
+                response = model.generate_content(prompt)
+                parsed_data = parse_response(response.text, rubric_keys)
+            except Exception as e:
+                fail(conn, idx, worker_id, e)
+            else:
+                if complete(conn, idx, worker_id, parsed_data):
+                    done += 1
+            sleep(delay) # تاخیر برای جلوگیری از محدودیت API
+    conn.close()
+    return done
+
+
+def _worker_process(db_path, batch_size, lease_seconds, delay):
+    run_worker(db_path, batch_size=batch_size, lease_seconds=lease_seconds, delay=delay)
+
+
+def run_workers(db_path, processes, batch_size=1, lease_seconds=LEASE_SECONDS, delay=1.0):
+    """ چند پردازش کارگر را روی همین ماشین اجرا کرده و منتظر اتمام همه می‌ماند. """
+    workers = [
+        multiprocessing.Process(target=_worker_process, args=(db_path, batch_size, lease_seconds, delay))
+        for _ in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+
+def collect_results(db_path):
+    """ نتایج را به ترتیب ردیف‌های ورودی برمی‌گرداند؛ برای آیتم‌های تمام‌نشده دیکشنری خالی قرار می‌گیرد. """
+    conn = connect(db_path)
+    results = [
+        json.loads(row["result"]) if row["result"] else {}
+        for row in conn.execute("SELECT result FROM items ORDER BY idx")
+    ]
+    conn.close()
+    return results
+
+
+def merge(db_path, df):
+    """ ستون‌های نتایج را به همان ترتیب ورودی کنار df قرار می‌دهد (مشابه final_df در اپلیکیشن‌ها). """
+    conn = connect(db_path)
+    meta = get_meta(conn)
+    conn.close()
+    if int(meta["total_rows"]) != len(df):
+        raise ValueError("تعداد ردیف‌های فایل ورودی با صف همخوانی ندارد.")
+    results_df = pd.DataFrame(collect_results(db_path))
+    results_df.rename(columns=result_columns(meta["rubrics"].split(",")), inplace=True)
+    results_df[TEXT_STATUS_COLUMN] = prepare_texts(df, meta["title_col"], meta["abstract_col"])[0][TEXT_STATUS_COLUMN].to_numpy()
+    return pd.concat([df.reset_index(drop=True), results_df.reset_index(drop=True)], axis=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="امتیازدهی توزیع‌شده پایان‌نامه‌ها با صف کاری SQLite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", help="ساخت صف از فایل اکسل")
+    p.add_argument("input")
+    p.add_argument("--db", required=True)
+    p.add_argument("--title-col", required=True)
+    p.add_argument("--abstract-col", required=True)
+    p.add_argument("--rubric", nargs="+", choices=sorted(RUBRICS), default=["innovation"],
+                   help="با انتخاب چند روبریک، هر ردیف با یک درخواست ترکیبی ارزیابی می‌شود")
+
+    p = sub.add_parser("work", help="اجرای کارگرها روی این ماشین")
+    p.add_argument("--db", required=True)
+    p.add_argument("--processes", type=int, default=1)
+    p.add_argument("--batch-size", type=int, default=1)
+    p.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS)
+    p.add_argument("--delay", type=float, default=1.0)
+
+    p = sub.add_parser("status", help="نمایش وضعیت صف")
+    p.add_argument("--db", required=True)
+
+    p = sub.add_parser("merge", help="ادغام نتایج با فایل ورودی به ترتیب اصلی")
+    p.add_argument("--db", required=True)
+    p.add_argument("--input", help="فایل اکسل ورودی (پیش‌فرض: همان فایل زمان ساخت صف)")
+    p.add_argument("--out", required=True)
+    p.add_argument("--warehouse", help="پوشه انبار نتایج تاریخی (results_warehouse.py) برای ثبت این کار")
+    p.add_argument("--group-col", help="ستون گروه (مثلاً دانشکده) برای گزارش‌های انبار")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        df = pd.read_excel(args.input)
+        n = enqueue(args.db, df, args.title_col, args.abstract_col, args.rubric, source=os.path.abspath(args.input))
+        print(f"{n} ردیف در صف قرار گرفت.")
+        conn = connect(args.db)
+        print(summary_message(json.loads(get_meta(conn)["text_summary"])))
+        conn.close()
+    elif args.command == "work":
+        run_workers(args.db, args.processes, args.batch_size, args.lease_seconds, args.delay)
+    elif args.command == "status":
+        conn = connect(args.db)
+        print(json.dumps(queue_status(conn), ensure_ascii=False))
+        conn.close()
+    elif args.command == "merge":
+        conn = connect(args.db)
+        meta = get_meta(conn)
+        counts = queue_status(conn)
+        conn.close()
+        if counts["pending"] or counts["leased"]:
+            print(f"هشدار: {counts['pending'] + counts['leased']} ردیف هنوز پردازش نشده است.")
+        df = pd.read_excel(args.input or meta["source"])
+        merged = merge(args.db, df)
+        merged.to_excel(args.out, index=False)
+        print(f"نتایج در {args.out} ذخیره شد.")
+        if args.warehouse:
+            from results_warehouse import append_job
+            n = append_job(merged, meta["rubrics"].split(","), MODEL_NAME, meta["title_col"], args.group_col,
+                           args.warehouse)
+            print(f"{n} سطر امتیاز در انبار {args.warehouse} ثبت شد.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+راه‌اندازی سریع اپلیکیشن‌های Streamlit.
+
+کتابخانه‌های سنگین (pandas، google.generativeai و ...) در ابتدای اسکریپت import نمی‌شوند تا
+صفحه و درخواست کلید API بلافاصله نمایش داده شوند. پس از اولین نمایش صفحه، warm_up یک بار
+برای هر پردازش این کتابخانه‌ها را در یک رشته پس‌زمینه import می‌کند (تا هنگام شروع تحلیل
+آماده باشند) و زمان import هر کدام را در لاگ سرور گزارش می‌دهد. مدل Gemini نیز فقط هنگام
+شروع تحلیل با make_model ساخته می‌شود.
+"""
+
+import importlib
+import threading
+import time
+
+import streamlit as st
+from streamlit.logger import get_logger
+
+from gemini_client import MODEL_NAME, make_model  # noqa: F401 (برای اپلیکیشن‌ها)
+
+HEAVY_MODULES = ("pandas", "google.generativeai", "xlsxwriter", "openpyxl")
+
+logger = get_logger(__name__)
+
+
+def import_profile(modules):
+    """ ماژول‌ها را به ترتیب import کرده و زمان هر کدام را (ثانیه) برمی‌گرداند؛ ماژول‌های از قبل بارگذاری‌شده تقریباً صفر هستند. """
+    profile = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning("warm-up: could not import %s: %s", name, e)
+            continue
+        profile[name] = time.perf_counter() - start
+    return profile
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up(modules=HEAVY_MODULES):
+    """
+    یک بار برای هر پردازش سرور، import ماژول‌های سنگین را در پس‌زمینه شروع می‌کند و بلافاصله برمی‌گردد.
+    خروجی: دیکشنری پروفایل import که پس از پایان رشته پر می‌شود.
+    """
+    profile = {}
+
+    def run():
+        profile.update(import_profile(modules))
+        logger.info("import-time profile: %s (total %.2fs)",
+                    ", ".join(f"{name} {seconds:.2f}s" for name, seconds in profile.items()),
+                    sum(profile.values()))
+
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
+    return profile
@@ -0,0 +1,122 @@
+"""
+نرمال‌سازی و اعتبارسنجی برداری متن فارسی پیش از ساخت دستور مدل.
+
+همه مراحل با متدهای رشته‌ای pandas روی کل ستون‌ها اجرا می‌شوند (نه حلقه پایتونی روی ردیف‌ها):
+حذف برچسب‌ها و موجودیت‌های HTML، تبدیل نویسه‌های عربی به فارسی، حذف اعراب و کشیده،
+مرتب‌سازی نیم‌فاصله (ZWNJ) و فاصله‌ها. خانه‌های خالی، NaN یا مقادیری مانند «nan» خالی در
+نظر گرفته می‌شوند تا ردیف‌های بدون عنوان یا چکیده اصلاً به مدل ارسال نشوند و چکیده‌های
+خیلی کوتاه یا خیلی بلند علامت‌گذاری می‌شوند.
+"""
+
+import html
+
+import pandas as pd
+
+TEXT_STATUS_COLUMN = "وضعیت متن"
+STATUS_OK = "سالم"
+STATUS_EMPTY = "عنوان یا چکیده خالی"
+STATUS_SHORT = "چکیده کوتاه"
+STATUS_LONG = "چکیده بلند"
+
+MIN_ABSTRACT_WORDS = 30
+MAX_ABSTRACT_WORDS = 1000
+
+ZWNJ = "\u200c"
+
+# برچسب HTML شناخته‌شده با ویژگی‌های name=value (مانند <p>، </span>، <br/>، <font color="red">)
+_HTML_TAG = (
+    r"(?i)</?(?:p|br|hr|div|span|b|i|u|s|em|strong|small|sup|sub|a|font|li|ul|ol|table|thead|tbody|tr|th|td"
+    r"|h[1-6]|img|blockquote|pre|code)"
+    r"""(?:\s+[\w:-]+\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'<>]+))*\s*/?>"""
+)
+
+# نویسه‌های عربی → فارسی، ارقام عربی → فارسی و فاصله بدون شکست → فاصله (\s در موتور regex پیش‌فرض
+# pyarrow فقط ASCII است). همزه‌ها (ئ، أ، ؤ) و ۀ در فارسی معتبرند و تغییر نمی‌کنند. هر گروه فقط
+# روی ردیف‌های دارای آن اجرا می‌شود و جایگزینی‌ها با str.replace غیرregex انجام می‌شوند
+# (بسیار سریع‌تر از str.translate که روی متن غیر ASCII نویسه به نویسه در پایتون اجرا می‌شود).
+_REPLACEMENTS = [
+    ("[\u064a\u0649]", [("\u064a", "\u06cc"), ("\u0649", "\u06cc")]),
+    ("\u0643", [("\u0643", "\u06a9")]),
+    ("\u0629", [("\u0629", "\u0647")]),
+    ("[\u0660-\u0669]", [(chr(0x0660 + d), chr(0x06F0 + d)) for d in range(10)]),
+    ("[\u00a0\u202f]", [("\u00a0", " "), ("\u202f", " ")]),
+]
+# اعراب (فتحه تا سکون)، کشیده و نویسه‌های نامرئی (فاصله صفر، علائم جهت‌دهی، BOM و خط تیره نرم)
+_REMOVE = "[\u064b-\u0652\u0640\u200b\u200e\u200f\ufeff\u00ad]"
+
+# ارقام فارسی و عربی و ممیز فارسی → ASCII برای تبدیل امتیازهای متنی به عدد
+_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩٫", "01234567890123456789.")
+
+_NULL_TOKENS = {"", "nan", "none", "null", "n/a", "na", "-", "—"}
+
+
+def _where(text, mask, fn):
+    # تبدیل پرهزینه فقط روی ردیف‌هایی که به آن نیاز دارند
+    if mask.any():
+        text = text.copy()
+        text[mask] = fn(text[mask])
+    return text
+
+
+def _replace_all(text, pairs):
+    for old, new in pairs:
+        text = text.str.replace(old, new, regex=False)
+    return text
+
+
+def normalize(series):
+    """ نرمال‌سازی یک ستون متنی؛ مقادیر خالی و NaN به رشته خالی تبدیل می‌شوند. """
+    text = pd.Series(series).fillna("").astype(str)
+    # فقط برچسب‌های شناخته‌شده HTML حذف می‌شوند؛ مقایسه‌هایی مانند «p<0.05»، «IC50>10» یا «x<y and z>w» باقی می‌مانند
+    text = _where(text, text.str.contains("<", regex=False), lambda t: t.str.replace(_HTML_TAG, " ", regex=True))
+    text = _where(text, text.str.contains("&", regex=False), lambda t: t.str.replace(
+        r"&(?:#\d+|#x[0-9a-fA-F]+|[a-zA-Z]+);", lambda m: html.unescape(m.group()), regex=True))
+    for pattern, pairs in _REPLACEMENTS:
+        text = _where(text, text.str.contains(pattern, regex=True), lambda t, pairs=pairs: _replace_all(t, pairs))
+    text = (
+        text.str.replace(_REMOVE, "", regex=True)
+        # فاصله‌های تکراری، تب و خط جدید به یک فاصله معمولی
+        .str.replace(r"\s{2,}|[^\S ]", " ", regex=True)
+    )
+    # نیم‌فاصله‌های تکراری یکی و نیم‌فاصله‌های کنار فاصله یا ابتدا/انتهای متن حذف می‌شوند
+    text = _where(text, text.str.contains(ZWNJ, regex=False), lambda t: (
+        _replace_all(t.str.replace(f"{ZWNJ}+", ZWNJ, regex=True), [(f" {ZWNJ}", " "), (f"{ZWNJ} ", " "), ("  ", " ")])
+        .str.replace(f"^{ZWNJ}|{ZWNJ}$", "", regex=True)))
+    text = text.str.strip()
+    return text.mask(text.str.lower().isin(_NULL_TOKENS), "")
+
+
+def to_numeric(values):
+    """ مانند pd.to_numeric(errors='coerce') اما امتیازهایی مانند «۳» یا «۷٫۵» را هم به عدد تبدیل می‌کند. """
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series.astype(str).str.translate(_DIGITS).str.strip(), errors='coerce')
+
+
+def text_status(titles, abstracts, min_words=MIN_ABSTRACT_WORDS, max_words=MAX_ABSTRACT_WORDS):
+    """ وضعیت هر ردیف (متن‌های نرمال‌شده): خالی، چکیده کوتاه، چکیده بلند یا سالم. """
+    words = abstracts.str.count(" ") + (abstracts != "")
+    status = pd.Series(STATUS_OK, index=abstracts.index)
+    status = status.mask(words < min_words, STATUS_SHORT).mask(words > max_words, STATUS_LONG)
+    return status.mask((titles == "") | (abstracts == ""), STATUS_EMPTY)
+
+
+def prepare_texts(df, title_col, abstract_col, min_words=MIN_ABSTRACT_WORDS, max_words=MAX_ABSTRACT_WORDS):
+    """
+    جدول (عنوان، چکیده، وضعیت متن) با همان ایندکس df و خلاصه‌ای از تعداد هر وضعیت برمی‌گرداند.
+    ردیف‌های با وضعیت «خالی» نباید به مدل ارسال شوند؛ تعداد آن‌ها همان فراخوانی‌های صرفه‌جویی‌شده است.
+    """
+    texts = pd.DataFrame({"title": normalize(df[title_col]), "abstract": normalize(df[abstract_col])})
+    texts.index = df.index
+    texts[TEXT_STATUS_COLUMN] = text_status(texts["title"], texts["abstract"], min_words, max_words)
+    counts = texts[TEXT_STATUS_COLUMN].value_counts()
+    summary = {status: int(counts.get(status, 0)) for status in (STATUS_OK, STATUS_SHORT, STATUS_LONG, STATUS_EMPTY)}
+    return texts, summary
+
+
+def summary_message(summary):
+    """ پیام کوتاه فارسی برای گزارش نتیجه پیش‌پردازش. """
+    return (f"🧹 {summary[STATUS_EMPTY]} ردیف بدون عنوان یا چکیده به مدل ارسال نمی‌شود "
+            f"({summary[STATUS_EMPTY]} فراخوانی API صرفه‌جویی شد)؛ "
+            f"{summary[STATUS_SHORT]} چکیده کوتاه و {summary[STATUS_LONG]} چکیده بلند علامت‌گذاری شد.")
@@ -0,0 +1,86 @@
+import streamlit as st
+import results_warehouse
+from rubrics import RUBRICS
+
+# --- Page Configuration ---
+st.set_page_config(
+    page_title="گزارش‌های تاریخی ارزیابی پایان‌نامه‌ها",
+    page_icon="🗄️",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# --- Functions ---
+
+@st.cache_data(ttl=60)
+def run_query(sql, warehouse_dir):
+    """ پرس‌وجوی DuckDB روی فایل‌های Parquet انبار؛ نتایج تا یک دقیقه کش می‌شوند """
+    return results_warehouse.query(sql, warehouse_dir)
+
+@st.cache_data(ttl=60)
+def load_rollup(rubric_key, criterion, by, warehouse_dir):
+    return results_warehouse.rollup_summary(rubric_key, criterion, list(by), warehouse_dir)
+
+# --- Streamlit App UI ---
+
+st.title("🗄️ گزارش‌های تاریخی ارزیابی پایان‌نامه‌ها")
+st.markdown("مقایسه امتیازها در طول زمان، بین دانشکده‌ها، نسخه‌های روبریک و مدل‌ها بر اساس همه کارهای ثبت‌شده در انبار نتایج.")
+
+st.sidebar.header("تنظیمات")
+warehouse_dir = st.sidebar.text_input("📁 پوشه انبار نتایج:", value=results_warehouse.DEFAULT_WAREHOUSE_DIR)
+if st.sidebar.button("🔄 به‌روزرسانی داده‌ها", use_container_width=True):
+    st.cache_data.clear()
+
+try:
+    jobs = run_query("""
+        SELECT job_id, rubric, rubric_version, model, min(scored_at) AS scored_at, count(DISTINCT row_id) AS theses
+        FROM scores GROUP BY ALL ORDER BY scored_at DESC
+    """, warehouse_dir)
+except Exception as e:
+    st.warning(f"انبار نتایج خالی است یا خوانده نشد: {e}")
+    st.stop()
+
+# --- گزارش تجمیعی ---
+st.header("📈 میانگین امتیاز شاخص‌ها")
+rubric_key = st.sidebar.selectbox("📋 روبریک:", sorted(jobs["rubric"].unique()),
+                                  format_func=lambda key: RUBRICS[key].LABEL if key in RUBRICS else key)
+criteria = run_query(f"SELECT DISTINCT criterion FROM rollup WHERE rubric = '{rubric_key}' ORDER BY 1",
+                     warehouse_dir)["criterion"].tolist()
+criterion = st.sidebar.selectbox("شاخص:", criteria)
+dimensions = {"group_name": "گروه", "year": "سال", "model": "مدل", "rubric_version": "نسخه روبریک"}
+by = st.sidebar.multiselect("تفکیک بر اساس:", list(dimensions), default=["group_name", "year"],
+                            format_func=dimensions.get)
+
+if criterion and by:
+    summary = load_rollup(rubric_key, criterion, tuple(by), warehouse_dir)
+    st.dataframe(summary.rename(columns={**dimensions, "n": "تعداد", "mean": "میانگین", "std": "انحراف معیار"}),
+                 hide_index=True)
+    if len(by) == 2:
+        # جدول محوری (مثلاً دانشکده × سال) برای نمودار مقایسه‌ای
+        chart = summary.pivot_table(index=by[1], columns=by[0], values="mean")
+        chart.index = chart.index.astype(str)
+        if by[1] == "year":
+            st.line_chart(chart)
+        else:
+            st.bar_chart(chart)
+    else:
+        st.bar_chart(summary.assign(label=summary[by].astype(str).agg(" / ".join, axis=1)).set_index("label")["mean"])
+
+# --- کارهای ثبت‌شده ---
+with st.expander(f"🧾 کارهای ثبت‌شده ({len(jobs)})"):
+    st.dataframe(jobs, hide_index=True)
+
+# --- پرس‌وجوی دلخواه ---
+st.header("🔍 پرس‌وجوی SQL")
+st.caption("نماهای scores (یک سطر برای هر پایان‌نامه و شاخص) و rollup (تعداد، مجموع و مجموع مربعات امتیازها) در دسترس هستند.")
+sql = st.text_area("پرس‌وجو:", value=(
+    "SELECT group_name, year, criterion, round(avg(score), 2) AS mean_score, count(*) AS n\n"
+    "FROM scores\nWHERE rubric = 'innovation'\nGROUP BY ALL\nORDER BY group_name, year, criterion"
+), height=150)
+if st.button("▶️ اجرا", type="primary"):
+    try:
+        result = run_query(sql, warehouse_dir)
+        st.dataframe(result.head(10000), hide_index=True)
+        st.caption(f"{len(result)} ردیف" + (" (فقط ۱۰۰۰۰ ردیف اول نمایش داده شده است)" if len(result) > 10000 else ""))
+    except Exception as e:
+        st.error(f"خطا در اجرای پرس‌وجو: {e}")